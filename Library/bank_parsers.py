@@ -0,0 +1,115 @@
+class BankParser:
+    """
+    Plan compilado de un producto bancario (p.ej. débito Banorte): firma de encabezados,
+    renombre a las columnas canónicas de banorte_load, columna y formatos de fecha, regla
+    de la llave unique_concept, columnas que el banco no trae y regla de period del
+    CutoffCalendar. Se arma una sola vez al iniciar; el ingest sólo consulta atributos.
+    """
+    KINDS = ('debit', 'credit', 'msi')
+    KEY_RULES = ('digits_or_letters',)
+    # Regla de period por tipo de cuenta (ver CutoffCalendar.assign_period)
+    PERIOD_RULES = {'debit': 'month', 'credit': 'cutoff', 'msi': None}
+
+    def __init__(self, name, bank, kind, headers, mapping=None, date_column='Fecha',
+                 concept_column='Concepto', date_formats=None, key_rule='digits_or_letters',
+                 null_columns=None, period_rule=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Parser {name}: tipo '{kind}' no soportado, usa uno de {self.KINDS}")
+        if key_rule not in self.KEY_RULES:
+            raise ValueError(f"Parser {name}: regla de llave '{key_rule}' no soportada, usa una de {self.KEY_RULES}")
+        self.name = name
+        self.bank = bank
+        self.kind = kind
+        self.headers = tuple(headers)
+        self.mapping = dict(mapping or {})
+        # Sólo se renombran los encabezados que cambian de nombre
+        self.rename = {src: dst for src, dst in self.mapping.items() if src != dst}
+        self.columns = list(dict.fromkeys(self.mapping.values()))
+        self.date_column = date_column
+        self.concept_column = concept_column
+        self.date_formats = tuple(date_formats) if date_formats else None
+        self.key_rule = key_rule
+        self.null_columns = tuple(null_columns or ())
+        self.period_rule = period_rule or self.PERIOD_RULES[kind]
+
+        faltantes = [col for col in (date_column, concept_column) if col not in self.headers]
+        if faltantes:
+            raise ValueError(f"Parser {name}: columnas {faltantes} no están en los encabezados")
+
+    def __repr__(self):
+        return f"BankParser({self.name!r}, kind={self.kind!r})"
+
+
+class ParserRegistry:
+    """
+    Registro de parsers por firma de encabezados. Se construye con la sección
+    bank_parsers de config.yaml; en cada entrada `headers` y `mapping` pueden ser una
+    lista/dict o el nombre de otra llave del config (p.ej. BANORTE_debit_headers).
+    Si el config no trae la sección se usan los parsers de Banorte de siempre.
+    """
+    DEFAULT_PARSERS = {
+        'banorte_debit': {
+            'bank': 'banorte',
+            'kind': 'debit',
+            'headers': 'BANORTE_debit_headers',
+            'mapping': 'mapping_debito_banorte',
+        },
+        'banorte_credit': {
+            'bank': 'banorte',
+            'kind': 'credit',
+            'headers': 'BANORTE_credit_headers',
+            'mapping': 'mapping_credito_banorte',
+            # El estado de cuenta de crédito no trae saldo por movimiento
+            'null_columns': ['saldo'],
+        },
+        'banorte_msi': {
+            'bank': 'banorte',
+            'kind': 'msi',
+            'headers': 'BANORTE_month_free_headers',
+            'mapping': 'mapping_msi_banorte',
+            'date_column': 'Fecha de operación',
+        },
+    }
+
+    def __init__(self, data_access):
+        self.parsers = {}
+        self.signatures = {}
+        definiciones = data_access.get('bank_parsers') or self.DEFAULT_PARSERS
+        for name, spec in definiciones.items():
+            spec = dict(spec)
+            headers = self._resolve(data_access, spec.pop('headers'))
+            if headers is None:
+                # El config no trae los encabezados de este producto
+                continue
+            mapping = self._resolve(data_access, spec.pop('mapping', None))
+            self.register(BankParser(name, headers=headers, mapping=mapping, **spec))
+
+    @staticmethod
+    def _resolve(data_access, value):
+        if isinstance(value, str):
+            return data_access.get(value)
+        return value
+
+    def register(self, parser):
+        firma = parser.headers
+        if firma in self.signatures and self.signatures[firma] != parser.name:
+            raise ValueError(f"Los parsers {self.signatures[firma]} y {parser.name} tienen los mismos encabezados")
+        self.parsers[parser.name] = parser
+        self.signatures[firma] = parser.name
+
+    def get(self, name):
+        return self.parsers.get(name)
+
+    def for_header(self, header):
+        """Parser cuyo encabezado coincide exactamente con `header`, o None."""
+        return self.parsers.get(self.signatures.get(tuple(header)))
+
+    def of_kind(self, kind):
+        return [parser for parser in self.parsers.values() if parser.kind == kind]
+
+    def columns_for(self, kind):
+        """Columnas canónicas (en orden) de los parsers de un tipo."""
+        columnas = []
+        for parser in self.of_kind(kind):
+            columnas.extend(parser.columns)
+        return list(dict.fromkeys(columnas))
@@ -0,0 +1,68 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+class ClosedPromotion:
+    """
+    Promoción de movimientos abiertos a cerrados cuando llega el estado de cuenta.
+    Los renglones del *_abierto que ya aparecen en *_cerrado (misma tx_key y cuenta) se
+    quitan del abierto en una sola sentencia, y en la misma se pasa a 'cerrado' el estado
+    de sus *_conceptos. El cruce recorre sólo el abierto (un mes) contra el índice de
+    tx_key del cerrado, así que el cierre cuesta lo del mes y no lo de la tabla completa.
+
+    Huérfanos: renglones que siguen abiertos con fecha anterior o igual al último
+    movimiento cerrado de su cuenta; el estado de cuenta ya cubrió esa fecha y no los
+    trajo (cancelaciones, reversos o un unique_concept que cambió).
+    """
+    FAMILIES = ('debito', 'credito')
+    ORPHAN_PREVIEW = 10
+
+    def __init__(self, schema='banorte_load'):
+        self.schema = schema
+
+    def promote(self, conn, familia, abierto=None):
+        """
+        Promueve contra `abierto` (por omisión {familia}_abierto; durante la carga, su tabla
+        sombra). Regresa {'promovidos', 'conceptos_cerrados', 'huerfanos'} e imprime el resumen.
+        """
+        abierto = abierto or f"{familia}_abierto"
+        promovidos, conceptos = conn.execute(text(f"""
+            WITH movidos AS (
+                DELETE FROM {self.schema}.{abierto} a
+                USING {self.schema}.{familia}_cerrado c
+                WHERE a.tx_key = c.tx_key
+                  AND a.cuenta = c.cuenta
+                RETURNING a.tx_key
+            ), conceptos AS (
+                UPDATE {self.schema}.{familia}_conceptos k
+                SET estado = 'cerrado', updated_at = NOW()
+                FROM movidos m
+                WHERE k.tx_key = m.tx_key
+                  AND k.estado IS DISTINCT FROM 'cerrado'
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM movidos), (SELECT COUNT(*) FROM conceptos)
+        """)).one()
+
+        df_huerfanos = self.orphans(conn, familia, abierto)
+        print(f"🔒 Promoción {familia}: {promovidos} movimientos abierto→cerrado, "
+              f"{conceptos} conceptos a cerrado, {len(df_huerfanos)} huérfanos.")
+        if not df_huerfanos.empty:
+            print(df_huerfanos.head(self.ORPHAN_PREVIEW).to_string(index=False))
+        return {'promovidos': promovidos, 'conceptos_cerrados': conceptos, 'huerfanos': len(df_huerfanos)}
+
+    def orphans(self, conn, familia, abierto=None):
+        """Abiertos cubiertos por el último cierre de su cuenta que no aparecieron en él."""
+        abierto = abierto or f"{familia}_abierto"
+        query = text(f"""
+            SELECT a.cuenta, a.fecha, a.concepto, a.cargo, a.abono, a.tx_key, u.ultimo_cierre
+            FROM {self.schema}.{abierto} a
+            CROSS JOIN LATERAL (
+                SELECT MAX(c.fecha) AS ultimo_cierre
+                FROM {self.schema}.{familia}_cerrado c
+                WHERE c.cuenta = a.cuenta
+            ) u
+            WHERE a.fecha <= u.ultimo_cierre
+            ORDER BY a.cuenta, a.fecha
+        """)
+        return pd.read_sql(query, conn)
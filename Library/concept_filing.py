@@ -8,11 +8,18 @@ from dotenv import load_dotenv
 import yaml
 from urllib.parse import urlparse
 
+try:
+    from Library.sql_reader import SqlReader
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from sql_reader import SqlReader
+
 class CONCEPT_FILING:
 
     def __init__(self, working_folder, data_access):
         self.working_folder = working_folder
         self.data_access = data_access 
+        self.sql_reader = SqlReader(self.data_access.get('fast_read_min_rows', 10000))
 
     def run_streamlit_interface(self):
         # 1) Parse DB URL from self.data_access['sql_workflow']
@@ -67,7 +74,7 @@ class CONCEPT_FILING:
                 ORDER BY fecha DESC
                 LIMIT 1000;
                 """
-                df_raw = pd.read_sql(query, conn)
+                df_raw = self.sql_reader.read(conn, query)
             except:
                 st.error("No se pudo cargar la tabla.")
                 return
@@ -80,12 +87,12 @@ class CONCEPT_FILING:
             # 2) Cargar catálogos
             # =====================================================
             try:
-                df_cat = pd.read_sql(f'SELECT DISTINCT "group", subgroup FROM "{schema}".category;', conn)
+                df_cat = self.sql_reader.read(conn, f'SELECT DISTINCT "group", subgroup FROM "{schema}".category;')
             except:
                 df_cat = pd.DataFrame(columns=["group", "subgroup"])
 
             try:
-                df_benef = pd.read_sql(f'SELECT nombre FROM "{schema}".beneficiaries;', conn)
+                df_benef = self.sql_reader.read(conn, f'SELECT nombre FROM "{schema}".beneficiaries;')
             except:
                 df_benef = pd.DataFrame(columns=["nombre"])
 
@@ -200,7 +207,7 @@ class CONCEPT_FILING:
         elif vista == "Catálogo de categorías":
             st.title("📘 Catálogo de Categorías")
             try:
-                df_cat = pd.read_sql(f'SELECT * FROM "{schema}".category ORDER BY "group", subgroup;', conn)
+                df_cat = self.sql_reader.read(conn, f'SELECT * FROM "{schema}".category ORDER BY "group", subgroup;')
             except Exception:
                 df_cat = pd.DataFrame(columns=["group", "subgroup"])
             st.dataframe(df_cat, use_container_width=True)
@@ -223,7 +230,7 @@ class CONCEPT_FILING:
         elif vista == "Catálogo de beneficiarios":
             st.title("📗 Catálogo de Beneficiarios")
             try:
-                df_benef = pd.read_sql(f'SELECT * FROM "{schema}".beneficiaries ORDER BY nombre;', conn)
+                df_benef = self.sql_reader.read(conn, f'SELECT * FROM "{schema}".beneficiaries ORDER BY nombre;')
             except Exception:
                 df_benef = pd.DataFrame(columns=["nombre"])
             st.dataframe(df_benef, use_container_width=True)
@@ -245,9 +252,9 @@ class CONCEPT_FILING:
         elif vista == "Catálogo de cuentas":
             st.title("💳 Catálogo de Cuentas")
             try:
-                df_accounts = pd.read_sql(
-                    f'SELECT * FROM "{schema}".accounts ORDER BY account_number;',
-                    conn
+                df_accounts = self.sql_reader.read(
+                    conn,
+                    f'SELECT * FROM "{schema}".accounts ORDER BY account_number;'
                 )
             except Exception:
                 df_accounts = pd.DataFrame(columns=["account_number", "type"])
@@ -0,0 +1,107 @@
+import os
+import re
+import pickle
+import numpy as np
+import pandas as pd
+
+
+class ConceptKeyCache:
+    """
+    Deriva la columna unique_concept a partir de Concepto trabajando sobre la columna
+    completa: factoriza los conceptos, calcula la llave sólo de los valores distintos que
+    no están en el cache y la reparte de vuelta con los códigos de la factorización.
+
+    La regla es la misma de siempre (forma parte de la llave primaria):
+    - Si el concepto tiene dígitos, la llave son todos sus dígitos concatenados.
+    - Si no, la llave son todas sus letras concatenadas.
+    - Un concepto nulo produce ''.
+
+    El cache concepto → llave se guarda en un pickle para no recalcular entre archivos ni
+    entre corridas.
+    """
+    CACHE_VERSION = 1
+    _NO_DIGITS = re.compile(r'[^0-9]+')
+    _NO_LETTERS = re.compile(r'[^A-Za-z]+')
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.keys = {}
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def concept_key(value):
+        """Regla escalar original; se usa para conceptos con caracteres fuera de ASCII."""
+        if pd.isna(value):
+            return ''
+        val_str = str(value)
+        digits = ''.join(filter(str.isdigit, val_str))
+        if digits:
+            return digits
+        return ''.join(filter(str.isalpha, val_str))
+
+    def derive(self, serie):
+        """Regresa una Serie con unique_concept alineada al índice de `serie`."""
+        codes, uniques = pd.factorize(serie, use_na_sentinel=True)
+        textos = [str(v) for v in uniques]
+
+        faltantes = [t for t in set(textos) if t not in self.keys]
+        if faltantes:
+            self.keys.update(self._derive_missing(faltantes))
+            self._dirty = True
+
+        # El código -1 (nulos) apunta al '' agregado al final
+        llaves = np.array([self.keys[t] for t in textos] + [''], dtype=object)
+        return pd.Series(llaves.take(codes), index=serie.index, dtype=object)
+
+    def _derive_missing(self, textos):
+        faltantes = pd.Series(textos, dtype=object)
+        ascii_mask = faltantes.str.isascii()
+
+        # ASCII: isdigit/isalpha equivalen a [0-9]/[A-Za-z], se resuelve con regex compilada
+        ascii_vals = faltantes[ascii_mask]
+        digits = ascii_vals.str.replace(self._NO_DIGITS, '', regex=True)
+        letters = ascii_vals.str.replace(self._NO_LETTERS, '', regex=True)
+        llaves = digits.where(digits != '', letters)
+
+        # Fuera de ASCII (acentos, superíndices, etc.) se respeta la regla unicode original
+        otros = faltantes[~ascii_mask]
+        llaves = pd.concat([llaves, otros.map(self.concept_key)])
+
+        return dict(zip(faltantes[llaves.index], llaves))
+
+    def remember(self, conceptos, llaves):
+        """Incorpora pares concepto → llave calculados en otro proceso."""
+        nuevos = {
+            str(c): k for c, k in zip(conceptos, llaves)
+            if not pd.isna(c) and str(c) not in self.keys
+        }
+        if nuevos:
+            self.keys.update(nuevos)
+            self._dirty = True
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                payload = pickle.load(f)
+            if payload.get('version') == self.CACHE_VERSION:
+                self.keys = payload.get('keys', {})
+            else:
+                print("ℹ️ Cache de unique_concept con versión distinta, se regenera.")
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el cache de unique_concept {self.cache_path}: {e}")
+
+    def save(self):
+        if not self.cache_path or not self._dirty:
+            return
+        try:
+            carpeta = os.path.dirname(self.cache_path)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            with open(self.cache_path, 'wb') as f:
+                pickle.dump({'version': self.CACHE_VERSION, 'keys': self.keys}, f)
+            self._dirty = False
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cache de unique_concept: {e}")
@@ -5,31 +5,314 @@ from datetime import date, datetime
 import pandas as pd
 import glob
 import numpy as np
-from psycopg2.extras import execute_values
-from pandas._libs.missing import NAType
-from pandas._libs.tslibs.nattype import NaTType
-from dateutil.relativedelta import relativedelta
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from openpyxl import Workbook
 
 try:
     from Library.initialize import INITIALIZE
+    from Library.helpers import Helper, DATE_FORMATS
+    from Library.concept_keys import ConceptKeyCache
+    from Library.ingest_ledger import IngestLedger
+    from Library.file_classifier import FileClassifier
+    from Library.schema_plan import SchemaPlan
+    from Library.bank_parsers import ParserRegistry, BankParser
+    from Library.cutoff_calendar import CutoffCalendar
+    from Library.msi_schedule import MsiSchedule
+    from Library.staging_loader import StagingLoader
+    from Library.money import Money
+    from Library.frame_memory import FrameMemory
+    from Library.tx_key import TxKey
+    from Library.closed_promotion import ClosedPromotion
+    from Library.load_verifier import LoadVerifier
+    from Library.run_journal import RunJournal
+    from Library.table_maintenance import TableMaintenance
+    from Library.sql_reader import SqlReader
 except ModuleNotFoundError:
     # fallback if running inside the Library folder
     from initialize import INITIALIZE
+    from helpers import Helper, DATE_FORMATS
+    from concept_keys import ConceptKeyCache
+    from ingest_ledger import IngestLedger
+    from file_classifier import FileClassifier
+    from schema_plan import SchemaPlan
+    from bank_parsers import ParserRegistry, BankParser
+    from cutoff_calendar import CutoffCalendar
+    from msi_schedule import MsiSchedule
+    from staging_loader import StagingLoader
+    from money import Money
+    from frame_memory import FrameMemory
+    from tx_key import TxKey
+    from closed_promotion import ClosedPromotion
+    from load_verifier import LoadVerifier
+    from run_journal import RunJournal
+    from table_maintenance import TableMaintenance
+    from sql_reader import SqlReader
 from dotenv import load_dotenv
 
 
+# Copia de CSV_TO_SQL de cada proceso trabajador del backfill
+_BACKFILL_APP = None
+
+
+def _init_backfill_worker(working_folder, data_access):
+    """
+    Cada proceso arma su propia instancia con la configuración y lee de la base lo poco que
+    necesita para parsear (cuentas y calendario de cortes), en lugar de recibir la del padre.
+    """
+    global _BACKFILL_APP
+    app = CSV_TO_SQL(working_folder, data_access)
+    engine = app.sql_conexion(data_access['sql_workflow'])
+    try:
+        with engine.connect() as conn:
+            app.df_accounts = app.sql_reader.read(conn, "SELECT * FROM banorte_load.accounts")
+            app.calendar = CutoffCalendar.load(conn, reader=app.sql_reader)
+    finally:
+        engine.dispose()
+    app.file_classifier.set_accounts(app.df_accounts['account_number'])
+    _BACKFILL_APP = app
+
+
+def _backfill_file(file):
+    return _BACKFILL_APP.process_closed_file(file)
+
+
 class CSV_TO_SQL:
-    def csv_to_sql_process(self):
+    # Tabla destino por (tipo de cuenta, estado)
+    TARGET_TABLES = {
+        ('debit', 'cerrado'): 'debito_cerrado',
+        ('credit', 'cerrado'): 'credito_cerrado',
+        ('debit', 'abierto'): 'debito_abierto',
+        ('credit', 'abierto'): 'credito_abierto',
+    }
+    # Tablas de movimientos: llevan tx_key, la llave por la que se cruzan con *_conceptos
+    TX_KEY_TABLES = tuple(TARGET_TABLES.values())
+    # Tablas que revisa el mantenimiento al final de la carga
+    MAINTENANCE_TABLES = TX_KEY_TABLES + ('debito_conceptos', 'credito_conceptos', 'msi_planes', 'msi_mensualidades')
+    # Copias simultáneas de un bloque durante lectura, normalización y carga
+    STREAMING_COPY_FACTOR = 4
+    # Tipos de cuenta con tablas debito_* / credito_*; el parser de cada archivo decide el tipo
+    CLOSED_KINDS = ('debit', 'credit')
+    # (familia, hoja) de sql_to_excel_export, en el orden del libro
+    EXPORT_SHEETS = (('credito', 'df_credit'), ('debito', 'df_debit'))
+
+    def csv_to_sql_process(self, full_reload=False, streaming=None, concurrent=None, resume=False):
+        """
+        Carga los CSV de Banorte a banorte_load.
+        Los archivos cerrados ya registrados en banorte_load.ingest_ledger (mismo hash de
+        contenido) se omiten; full_reload=True ignora el ledger y vuelve a procesar todo.
+        Con streaming=True (o streaming_ingest en config.yaml) los cerrados se suben en bloques
+        acotados por streaming_memory_mb sin juntar el histórico en un solo DataFrame.
+        Con concurrent=True (o concurrent_load en config.yaml) las tablas de débito y de
+        crédito se cargan en conexiones separadas del pool; cada carril se confirma por su
+        lado (todo-o-nada por carril, no entre carriles).
+        Cada etapa terminada queda en la bitácora (RunJournal); con resume=True, si los CSV
+        no cambiaron, se retoma la corrida interrumpida en la primera etapa incompleta.
+        Sin resume la carga en secuencia va en una sola transacción; con resume cada tabla
+        se confirma por separado para que cuente como etapa.
+        """
+        if streaming is None:
+            streaming = self.data_access.get('streaming_ingest', False)
+        if concurrent is None:
+            concurrent = self.data_access.get('concurrent_load', False)
+        if concurrent and streaming:
+            # Los cerrados ya quedaron en la conexión principal sin confirmar; un carril que
+            # sincronice el mismo *_conceptos esperaría por ella
+            print("ℹ️ La carga concurrente no aplica con streaming; se carga en secuencia.")
+            concurrent = False
+
         # 1️⃣ Conectar
-        connexion = self.sql_conexion(self.data_access['sql_workflow']).connect()
+        engine = self.sql_conexion(self.data_access['sql_workflow'])
+        connexion = None if engine is None else engine.connect()
         if connexion is None:
             print("❌ No se pudo establecer conexión con SQL Server.")
             return False
 
-        # 2️⃣ Intentar leer tabla de cuentas
+        # 2️⃣ Leer y validar tabla de cuentas
+        if not self.load_accounts(connexion):
+            return False
+        
+        # Columnas canónicas de debit y credit (cada parser ya renombró las de su banco)
+        mapping_debito = self.kind_mappings['debit']
+        mapping_credito = self.kind_mappings['credit']
+        primary_keys = ['fecha', 'unique_concept', 'cargo', 'abono']
+
+        # Ledger de archivos cerrados ya cargados
+        self.load_ledger(connexion, full_reload)
+        # Fechas de corte (cutoff_days) una sola vez por corrida
+        self.calendar = CutoffCalendar.load(connexion, reader=self.sql_reader)
+
+        # Bitácora de la corrida: con resume se retoma en la primera etapa incompleta
+        entradas = glob.glob(os.path.join(self.closed_folder, '*.csv')) + glob.glob(os.path.join(self.current_folder, '*.csv'))
+        self.journal.start(RunJournal.run_key(entradas), resume)
+        if not self.journal.is_done('discover'):
+            self.journal.mark_done('discover', archivos=sorted(os.path.basename(f) for f in entradas))
+
+        # Se suelta la transacción de lectura antes de escribir nada: borrar una sombra que
+        # dejó una corrida interrumpida pide un lock exclusivo sobre accounts (por su FK)
+        connexion.commit()
+        self.prepare_shadows(engine, [table_name for table_name in ('debito_abierto', 'credito_abierto')
+                                      if not self.journal.is_done(f"load {table_name}")])
+
+        # CLOSED DATAFRAMES
+        # Etapas de carga ya hechas pero sin confirmar; se anotan después del commit final
+        por_confirmar = {}
+        if streaming:
+            # Los cerrados van bloque por bloque directo a SQL; con resume cada tabla se confirma al terminar
+            for key in self.CLOSED_KINDS:
+                table_name = self.TARGET_TABLES[(key, 'cerrado')]
+                if self.journal.is_done(f"load {table_name}"):
+                    continue
+                filas = self.stream_to_sql(connexion, self.closed_folder, {key: 'cerrado'}, primary_keys)
+                diferencias = self.verify_load(connexion, table_name)
+                self.ingest_ledger.record(connexion, table_name)
+                por_confirmar[f"load {table_name}"] = {'filas': filas, 'no_cuadran': None if diferencias is None else len(diferencias)}
+                if resume:
+                    connexion.commit()
+                    self.journal.mark_done(f"load {table_name}", **por_confirmar.pop(f"load {table_name}"))
+
+        nombres = ['debit_closed', 'credit_closed', 'debit_current', 'credit_current']
+        if self.journal.is_done('normalize'):
+            # Se retoman los DataFrames ya normalizados y los archivos pendientes del ledger
+            frames = self.journal.load_frames('normalize', nombres)
+            df_debit_closed, df_credit_closed, df_debit_current, df_credit_current = (frames[n] for n in nombres)
+            self.ingest_ledger.pending = self.journal.get('parse')['ledger_pending']
+            print("↩️ DataFrames normalizados recuperados de la bitácora.")
+        else:
+            if streaming:
+                df_debit_closed = df_credit_closed = None
+            else:
+                # Generate closed dataframes to upload
+                df_debit_closed = self.get_dataframes_to_upload(self.closed_folder, {'debit': 'cerrado'})
+                df_credit_closed = self.get_dataframes_to_upload(self.closed_folder, {'credit': 'cerrado'})
+
+            # CURRENT DATAFRAMES
+            # Generate current dataframes to upload
+            df_debit_current = self.get_dataframes_to_upload(self.current_folder, {'debit': 'abierto'})
+            df_credit_current = self.get_dataframes_to_upload(self.current_folder, {'credit': 'abierto'})
+            print("DataFrames 'Current' to upload summary:")
+            print(df_credit_current.groupby('cuenta', observed=True).size())
+            print(df_debit_current.groupby('cuenta', observed=True).size())
+            leidos = {
+                'debit_closed': df_debit_closed, 'credit_closed': df_credit_closed,
+                'debit_current': df_debit_current, 'credit_current': df_credit_current}
+            FrameMemory.report('lectura', leidos)
+            self.journal.mark_done('parse', filas={name: None if df is None else len(df) for name, df in leidos.items()},
+                                   ledger_pending=self.ingest_ledger.pending)
+
+            if not self.journal.is_done('export'):
+                # Save uploaded to excel
+                excel_output = os.path.join(os.path.expanduser("~"), "Downloads", "Banorte_SQL_upload_Data.xlsx")
+                with pd.ExcelWriter(excel_output) as writer:
+                    # Montos en pesos sólo para el archivo; el pipeline sigue en centavos
+                    if not streaming:
+                        Money.frame_to_float(df_debit_closed).to_excel(writer, sheet_name='Debit_Closed', index=False)
+                        Money.frame_to_float(df_credit_closed).to_excel(writer, sheet_name='Credit_Closed', index=False)
+                    Money.frame_to_float(df_debit_current).to_excel(writer, sheet_name='Debit_Current', index=False)
+                    Money.frame_to_float(df_credit_current).to_excel(writer, sheet_name='Credit_Current', index=False)
+                print(f"✅ DataFrames exported to Excel at {excel_output}")
+                self.journal.mark_done('export', archivo=excel_output)
+
+            # Column normalization to set query ready
+            if not streaming:
+                df_debit_closed = self.column_normalization(df_debit_closed, mapping_debito)
+                df_credit_closed = self.column_normalization(df_credit_closed, mapping_credito)
+            # Column normalization to set query ready
+            df_debit_current = self.column_normalization(df_debit_current, mapping_debito)
+            df_credit_current = self.column_normalization(df_credit_current, mapping_credito)
+            normalizados = {
+                'debit_closed': df_debit_closed, 'credit_closed': df_credit_closed,
+                'debit_current': df_debit_current, 'credit_current': df_credit_current}
+            FrameMemory.report('normalización', normalizados)
+            if resume:
+                # Los parquet sólo sirven para retomar; sin resume la etapa no se anota y una
+                # corrida reanudada vuelve a leer los CSV
+                self.journal.mark_done('normalize', frames=self.journal.save_frames('normalize', normalizados))
+
+        # Upload to SQL: un carril por familia; las dos tablas de un carril sincronizan el
+        # mismo *_conceptos, así que comparten conexión (cerrado y luego abierto)
+        lanes = {
+            'debito': [('debito_cerrado', df_debit_closed, False), ('debito_abierto', df_debit_current, True)],
+            'credito': [('credito_cerrado', df_credit_closed, False), ('credito_abierto', df_credit_current, True)],
+        }
+        # Con streaming los cerrados ya se subieron; lo confirmado en una corrida anterior no se repite
+        lanes = {lane: [load for load in loads if load[1] is not None and not self.journal.is_done(f"load {load[0]}")]
+                 for lane, loads in lanes.items()}
+        lanes = {lane: loads for lane, loads in lanes.items() if loads}
+        inicio = time.perf_counter()
+        if concurrent:
+            try:
+                tiempos = self.load_concurrently(engine, connexion, lanes, primary_keys)
+            except Exception as e:
+                print(f"❌ Carga concurrente incompleta; sólo quedaron confirmados los carriles que terminaron: {e}")
+                connexion.close()
+                return False
+        else:
+            # Con resume cada tabla se confirma (y se anota en la bitácora) en cuanto termina;
+            # sin él todo se confirma junto al final
+            tiempos = [t for lane, loads in lanes.items()
+                       for t in self.load_lane(connexion, lane, loads, primary_keys, engine if resume else None)]
+            if not self.journal.is_done('load msi'):
+                # Meses sin intereses: planes del archivo de hoy y sus mensualidades pendientes
+                self.load_msi(connexion)
+            publicadas = self.publish_shadows(connexion)
+            connexion.commit()
+            self.drop_previous_tables(engine, publicadas)
+            for stage, datos in por_confirmar.items():
+                self.journal.mark_done(stage, **datos)
+            self.mark_loads_done(tiempos)
+        connexion.close()
+        if tiempos:
+            print(pd.DataFrame(tiempos).to_string(index=False))
+        print(f"⏱️ Carga {'concurrente' if concurrent else 'secuencial'}: {time.perf_counter() - inicio:.2f}s.")
+        if not self.journal.is_done('maintenance'):
+            df_stats = self.run_maintenance(engine)
+            if df_stats is not None and not df_stats.empty:
+                self.journal.mark_done('maintenance',
+                                       analizadas=df_stats.loc[df_stats['analyzed'], 'table_name'].tolist(),
+                                       vacuum=df_stats.loc[df_stats['needs_vacuum'], 'table_name'].tolist())
+        self.journal.mark_done('verify', no_cuadran={
+            stage.split(' ', 1)[1]: record.get('no_cuadran')
+            for stage, record in self.journal.state['stages'].items() if stage.startswith('load ') and 'no_cuadran' in record})
+        self.journal.finish()
+        FrameMemory.report('carga', {})
+        self.concept_keys.save()
+        self.file_classifier.save()
+        
+        # Con el ledger (y en streaming) los DataFrames cerrados sólo traen lo nuevo de esta
+        # corrida; las hojas *_closed se reescriben completas, así que se leen de la base
+        dict_dataframes = {
+            **self.closed_history(engine),
+            'debit_current': Money.frame_to_float(df_debit_current),
+            'credit_current': Money.frame_to_float(df_credit_current)}
+        
+        return dict_dataframes
+
+    def closed_history(self, engine):
+        """
+        Histórico cerrado completo ({'debit_closed', 'credit_closed'}) con las columnas
+        canónicas y montos en pesos. Si no se puede leer, se regresan None para que las
+        hojas no se toquen.
+        """
+        history = {}
+        for key in self.CLOSED_KINDS:
+            table_name = self.TARGET_TABLES[(key, 'cerrado')]
+            columnas = ", ".join(self.kind_mappings[key].values())
+            try:
+                with engine.connect() as conn:
+                    history[f"{key}_closed"] = self.sql_reader.read(
+                        conn, f"SELECT {columnas} FROM banorte_load.{table_name} ORDER BY fecha")
+            except Exception as e:
+                print(f"⚠️ No se pudo leer banorte_load.{table_name}; la hoja {key}_closed no se actualiza: {e}")
+                history[f"{key}_closed"] = None
+        return history
+
+    def load_accounts(self, connexion):
+        """Lee banorte_load.accounts en self.df_accounts; crea el esquema si no existe."""
         try:
             query = "SELECT * FROM banorte_load.accounts"
-            self.df_accounts = pd.read_sql(query, connexion)
+            self.df_accounts = self.sql_reader.read(connexion, query)
             print(f"✅ Loaded accounts: {len(self.df_accounts)} registros.")
 
         except Exception as e:
@@ -44,7 +327,7 @@ class CSV_TO_SQL:
 
                 # Reintento
                 try:
-                    self.df_accounts = pd.read_sql("SELECT * FROM banorte_load.accounts", connexion)
+                    self.df_accounts = self.sql_reader.read(connexion, "SELECT * FROM banorte_load.accounts")
                     print(f"✅ Loaded accounts after creation: {len(self.df_accounts)} registros.")
                 except Exception as e2:
                     print(f"❌ Error after trying to create schema/tables: {e2}")
@@ -59,7 +342,7 @@ class CSV_TO_SQL:
 
                 # Reintento
                 try:
-                    self.df_accounts = pd.read_sql("SELECT * FROM banorte_load.accounts", connexion)
+                    self.df_accounts = self.sql_reader.read(connexion, "SELECT * FROM banorte_load.accounts")
                     print(f"✅ Loaded accounts after creation: {len(self.df_accounts)} registros.")
                 except Exception as e2:
                     print(f"❌ Error after trying to create schema/tables: {e2}")
@@ -68,74 +351,186 @@ class CSV_TO_SQL:
                 print(f"❌ Error ejecutando la consulta SQL: {e}")
                 return False
 
-        # 3️⃣ Validar contenido de cuentas
+        # Validar contenido de cuentas
         if self.df_accounts.empty:
             print("⚠️ No hay registros en 'banorte_load.accounts'. Captura cuentas antes de comenzar.")
             return False
-        
-        # Mapping columns for both debit and credit
-        mapping_debito = self.data_access['mapping_debito_banorte']
-        mapping_credito = self.data_access['mapping_credito_banorte']
-        primary_keys = ['fecha', 'unique_concept', 'cargo', 'abono']
 
-        # CLOSED DATAFRAMES
-        # Generate closed dataframes to upload
-        df_debit_closed = self.get_dataframes_to_upload(self.closed_folder, 'BANORTE_debit_headers',  {'debit': 'cerrado'})
-        df_credit_closed = self.get_dataframes_to_upload(self.closed_folder, 'BANORTE_credit_headers',  {'credit': 'cerrado'})
-
-        # CURRENT DATAFRAMES
-        # Generate current dataframes to upload
-        df_debit_current = self.get_dataframes_to_upload(self.current_folder, 'BANORTE_debit_headers',  {'debit': 'abierto'})
-        df_credit_current = self.get_dataframes_to_upload(self.current_folder, 'BANORTE_credit_headers',  {'credit':'abierto'}) 
-        print("DataFrames 'Current' to upload summary:")
-        print(df_credit_current.groupby('cuenta').size())
-        print(df_debit_current.groupby('cuenta').size())
-       # Save uploaded to excel         
-        excel_output = os.path.join(os.path.expanduser("~"), "Downloads", "Banorte_SQL_upload_Data.xlsx")
-        with pd.ExcelWriter(excel_output) as writer:
-            df_debit_closed.to_excel(writer, sheet_name='Debit_Closed', index=False)
-            df_credit_closed.to_excel(writer, sheet_name='Credit_Closed', index=False)
-            df_debit_current.to_excel(writer, sheet_name='Debit_Current', index=False)
-            df_credit_current.to_excel(writer, sheet_name='Credit_Current', index=False)
-        print(f"✅ DataFrames exported to Excel at {excel_output}")
-
-        # Column normalization to set query ready
-        df_debit_closed = self.column_normalization(df_debit_closed, mapping_debito)
-        df_credit_closed = self.column_normalization(df_credit_closed, mapping_credito)
-        # Column normalization to set query ready
-        df_debit_current = self.column_normalization(df_debit_current, mapping_debito)
-        df_credit_current = self.column_normalization(df_credit_current, mapping_credito)
-
- 
-
-
-        # Upload closed dataframes to SQL
-        self.upsert_dataframe(connexion, df_debit_closed, "banorte_load", "debito_cerrado", primary_keys)
-        self.upsert_dataframe(connexion, df_credit_closed, "banorte_load", "credito_cerrado", primary_keys)
-        self.upsert_dataframe(connexion, df_debit_current, "banorte_load", "debito_abierto", primary_keys, overwrite_all = True)
-        self.upsert_dataframe(connexion, df_credit_current, "banorte_load", "credito_abierto", primary_keys, overwrite_all = True)
-        # Commit and close the connection
-        connexion.commit()
+        self.file_classifier.set_accounts(self.df_accounts['account_number'])
+        return True
+
+    def load_ledger(self, connexion, full_reload=False):
+        # ledger_ready: se registran los archivos cargados; use_ledger: además se omiten los ya cargados
+        try:
+            registrados = self.ingest_ledger.load(connexion)
+            print(f"🧾 Ledger: {registrados} archivos cerrados ya cargados.")
+            self.ledger_ready = True
+        except Exception as e:
+            print(f"⚠️ No se pudo leer banorte_load.ingest_ledger, se procesan todos los archivos: {e}")
+            connexion.rollback()
+            self.ledger_ready = False
+        self.use_ledger = self.ledger_ready and not full_reload
+
+    def backfill(self, workers=None, full_reload=False):
+        """
+        Carga histórica de la carpeta de cerrados repartiendo el trabajo por archivo
+        (lectura, fechas, unique_concept y normalización) en un pool de procesos.
+        Los resultados se juntan en el orden de los archivos y se suben con upsert_dataframe.
+        Regresa el reporte de tiempos por archivo.
+        """
+        engine = self.sql_conexion(self.data_access['sql_workflow'])
+        connexion = None if engine is None else engine.connect()
+        if connexion is None:
+            print("❌ No se pudo establecer conexión con SQL Server.")
+            return False
+        try:
+            if not self.load_accounts(connexion):
+                return False
+            self.load_ledger(connexion, full_reload)
+            self.calendar = CutoffCalendar.load(connexion, reader=self.sql_reader)
+            primary_keys = ['fecha', 'unique_concept', 'cargo', 'abono']
+
+            # Clasificar antes de crear el pool y guardar el cache de encabezados: cada proceso
+            # lo lee al armar su instancia y no vuelve a clasificar
+            files = sorted(
+                f for f in glob.glob(os.path.join(self.closed_folder, '*.csv'))
+                if getattr(self.file_classifier.parser_for(f), 'kind', None) in self.CLOSED_KINDS
+            )
+            self.file_classifier.save()
+            if self.use_ledger:
+                files = [f for f in files if not self.ingest_ledger.is_loaded(self.get_file_hash(f))]
+            if not files:
+                print("✅ No hay archivos cerrados nuevos para el backfill.")
+                self.load_msi(connexion)
+                connexion.commit()
+                return pd.DataFrame(columns=['archivo', 'tipo', 'filas', 'segundos'])
+
+            workers = workers or self.data_access.get('backfill_workers') or os.cpu_count()
+            print(f"🚀 Backfill de {len(files)} archivos con {workers} procesos...")
+            inicio = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_backfill_worker,
+                                     initargs=(self.working_folder, self.data_access)) as executor:
+                # map conserva el orden de `files`, así el resultado es determinista
+                results = list(executor.map(_backfill_file, files))
+            parse_seconds = time.perf_counter() - inicio
+
+            frames = {key: [] for key in self.CLOSED_KINDS}
+            report = []
+            for file, key, df_file, elapsed in results:
+                filename = os.path.basename(file)
+                report.append({'archivo': filename, 'tipo': key, 'filas': 0 if df_file is None else len(df_file), 'segundos': round(elapsed, 3)})
+                if df_file is None:
+                    continue
+                frames[key].append(df_file)
+                self.concept_keys.remember(df_file['concepto'], df_file['unique_concept'])
+                if self.ledger_ready:
+                    target = self.TARGET_TABLES[(key, 'cerrado')]
+                    self.ingest_ledger.add_pending(target, self.get_file_hash(file), filename, df_file['cuenta'].iloc[0], len(df_file))
+
+            df_report = pd.DataFrame(report)
+            print(df_report.to_string(index=False))
+            print(f"⏱️ Parseo en paralelo: {parse_seconds:.2f}s para {int(df_report['filas'].sum())} filas.")
+            FrameMemory.report('backfill', {f"{key}_{i}": df for key, dfs in frames.items() for i, df in enumerate(dfs)})
+
+            for key in self.CLOSED_KINDS:
+                if not frames[key]:
+                    continue
+                table_name = self.TARGET_TABLES[(key, 'cerrado')]
+                inicio = time.perf_counter()
+                self.upsert_dataframe(connexion, FrameMemory.concat(frames[key]), "banorte_load", table_name, primary_keys)
+                self.verify_load(connexion, table_name)
+                if self.ledger_ready:
+                    self.ingest_ledger.record(connexion, table_name)
+                # Los movimientos que este cierre ya cubre salen de la tabla abierta
+                self.closed_promotion.promote(connexion, table_name.split('_')[0])
+                print(f"⏱️ Carga de {table_name}: {time.perf_counter() - inicio:.2f}s")
+
+            # Las mensualidades se expanden sobre el calendario que ya incluye los cierres cargados
+            self.load_msi(connexion)
+            connexion.commit()
+        finally:
+            connexion.close()
+        self.run_maintenance(connexion.engine)
+        self.concept_keys.save()
+        self.file_classifier.save()
+        return df_report
+
+    def load_msi(self, connexion):
+        """
+        Carga los archivos MSI de hoy. Cada archivo es la foto de los planes vigentes de
+        su cuenta: se reemplazan los planes de esas cuentas y se expanden las mensualidades
+        pendientes sobre el calendario de cortes. Regresa el DataFrame de mensualidades.
+        """
+        df_planes = self.get_dataframes_to_upload(self.current_folder, {'msi': 'abierto'})
+        if df_planes.empty:
+            print("ℹ️ No hay archivos MSI de hoy.")
+            return None
+
+        # Los planes no llevan estado (msi_planes no tiene la columna)
+        df_planes = self.column_normalization(df_planes.drop(columns='estado', errors='ignore'), self.kind_mappings['msi'])
+        cuentas = df_planes['cuenta'].unique()
+        df_planes = MsiSchedule.prepare_plans(df_planes)
+        df_cuotas = MsiSchedule.expand(df_planes, self.calendar)
+
+        self.msi_schedule.ensure_tables(connexion)
+        borrados = self.msi_schedule.clear_pending(connexion, cuentas)
+        self.upsert_dataframe(connexion, df_planes, "banorte_load", "msi_planes", MsiSchedule.PLAN_KEYS)
+        self.upsert_dataframe(connexion, df_cuotas, "banorte_load", "msi_mensualidades", MsiSchedule.INSTALLMENT_KEYS)
+        print(f"💳 MSI: {len(df_planes)} planes ({borrados} reemplazados), {len(df_cuotas)} mensualidades pendientes.")
+        return df_cuotas
+
+    def msi_projection(self, months=6):
+        """Obligaciones MSI de los próximos `months` meses por period y cuenta."""
+        engine = self.sql_conexion(self.data_access['sql_workflow'])
+        connexion = None if engine is None else engine.connect()
+        if connexion is None:
+            print("❌ No se pudo establecer conexión con SQL Server.")
+            return False
+        df_proyeccion = self.msi_schedule.projection(connexion, months)
         connexion.close()
-        
-        dict_dataframes = {
-            'debit_closed': df_debit_closed,
-            'credit_closed': df_credit_closed,
-            'debit_current': df_debit_current,
-            'credit_current': df_credit_current}
-        
-        return dict_dataframes
+        print(df_proyeccion.to_string(index=False))
+        return df_proyeccion
+
+    def process_closed_file(self, file):
+        """Trabajo por archivo del backfill; regresa (archivo, tipo, DataFrame normalizado, segundos)."""
+        inicio = time.perf_counter()
+        parser = self.file_classifier.parser_for(file)
+        if parser is not None and parser.kind in self.CLOSED_KINDS:
+            frames = list(self.iter_file_frames(file, {parser.kind: 'cerrado'}))
+            if frames:
+                df_file = self.column_normalization(FrameMemory.concat(frames), self.kind_mappings[parser.kind])
+                return file, parser.kind, df_file, time.perf_counter() - inicio
+        return file, None, None, time.perf_counter() - inicio
+
+    def get_dataframes_to_upload(self, folder, estado):
+        key = list(estado.keys())[0]
+
+        # Se juntan los bloques por archivo y se concatena una sola vez al final;
+        # FrameMemory.concat conserva las columnas repetidas como categóricas
+        frames = list(self.iter_dataframes_to_upload(folder, estado))
 
-    def get_dataframes_to_upload(self, folder, header, estado):
-        df_generated = pd.DataFrame()
+        # 4️⃣ If still empty after processing
+        if not frames:
+            return pd.DataFrame(columns=self.parsers.columns_for(key))
 
-        expected_columns = self.data_access[header] + ['cuenta']
+        return FrameMemory.concat(frames)
+
+    def iter_dataframes_to_upload(self, folder, estado, chunk_rows=None):
+        """
+        Genera los DataFrames normalizados archivo por archivo.
+        Con chunk_rows cada archivo se lee en bloques de a lo más chunk_rows renglones;
+        chunk_rows='auto' calcula el tamaño del bloque según streaming_memory_mb de config.yaml.
+        """
+        key, value = list(estado.items())[0]  # Ej. ('debit', 'abierto')
+        target = self.TARGET_TABLES.get((key, value))
+        use_ledger = value == 'cerrado' and getattr(self, 'use_ledger', False)
+        record_ledger = value == 'cerrado' and getattr(self, 'ledger_ready', False)
+        skipped = 0
 
         # 1️⃣ Detect files based on estado
-        if list(estado.values())[0] == 'cerrado':
+        if value == 'cerrado':
             csv_files = glob.glob(os.path.join(folder, '*.csv'))
-        elif list(estado.values())[0] == 'abierto':
-            #(f"Archivos CSV encontrados: {[f for f in glob.glob(os.path.join(folder, '*.csv'))]}")
+        elif value == 'abierto':
             csv_files = [f for f in glob.glob(os.path.join(folder, '*.csv')) if self.get_file_date(f) == self.today]
             print(f"Archivos CSV encontrados para estado abierto: {[os.path.basename(i) for i in csv_files]}")
         else:
@@ -143,157 +538,380 @@ class CSV_TO_SQL:
 
         # 2️⃣ Handle case where no files are found
         if not csv_files:
-            print(f"⚠️ No CSV files found in {folder} for estado={list(estado.values())[0]}")
-            # Return an empty dataframe with expected columns (and add the ones used later)
-            df_empty = pd.DataFrame(columns=expected_columns + [
-                'Fecha', 'unique_concept', 'estado', 'file_name', 'file_date', 'saldo'
-            ])
-            return df_empty
+            print(f"⚠️ No CSV files found in {folder} for estado={value}")
+            return
 
         # 3️⃣ Process files normally
         for file in csv_files:
-            try:
-                df_file = pd.read_csv(file)
-            except Exception as e:
-                print(f"⚠️ Error reading file {os.path.basename(file)}: {e}, skipping.")
-                continue
+            file_hash = self.get_file_hash(file) if record_ledger else None
+            if use_ledger:
+                if self.ingest_ledger.is_loaded(file_hash):
+                    skipped += 1
+                    continue
+
+            file_rows = 0
+            cuenta = None
+            for df_file in self.iter_file_frames(file, estado, chunk_rows):
+                file_rows += len(df_file)
+                cuenta = df_file['cuenta'].iloc[0]
+                yield df_file
+
+            if file_hash is not None and file_rows:
+                self.ingest_ledger.add_pending(target, file_hash, os.path.basename(file), cuenta, file_rows)
+
+        if skipped:
+            print(f"⏭️ {skipped} archivos en {os.path.basename(folder)} ya estaban en el ledger, se omiten.")
+
+    def iter_file_frames(self, file, estado, chunk_rows=None):
+        """Lee un archivo (completo o por bloques) y genera sus DataFrames normalizados."""
+        key, value = list(estado.items())[0]
+        filename = os.path.basename(file)
+
+        # El encabezado decide el parser sin leer el archivo completo
+        parser = self.file_classifier.parser_for(file)
+        if parser is None or parser.kind != key:
+            return
+        expected_columns = list(parser.headers)
 
-            filename = os.path.basename(file)
-            matched_accounts = [str(acc) for acc in self.df_accounts['account_number'] if str(acc) in filename]
-            if matched_accounts:
-                df_file['cuenta'] = matched_accounts[0]
-            else:
-                print(f"⚠️ No se encontró número de cuenta en {filename}, saltando archivo.")
-                continue
-
-            file_date = self.get_file_date(file)
-
-            if list(df_file.columns) == expected_columns:
-                def extract_unique_concept(val):
-                    if pd.isna(val):
-                        return ''
-                    val_str = str(val)
-                    digits = ''.join(filter(str.isdigit, val_str))
-                    if digits:
-                        return digits
-                    letters = ''.join(filter(str.isalpha, val_str))
-                    return letters
-
-                df_file['Fecha'] = df_file['Fecha'].apply(self.parse_fecha)
-                df_file['unique_concept'] = df_file['Concepto'].apply(extract_unique_concept)
-                df_file['estado'] = list(estado.values())[0]
-                df_file['file_name'] = filename
-                df_file['file_date'] = file_date
-
-                # Generate period column 
-                key, value = list(estado.items())[0]  # Ej. ('debit', 'abierto')
-
-                if value == 'abierto':
-                    if key == 'debit':
-                        df_file['period'] = self.today.strftime('%Y-%m')
-                    elif key == 'credit':
-                        next_month = self.today + relativedelta(months=+1)
-                        df_file['period'] = next_month.strftime('%Y-%m')
-
-                if list(estado.keys())[0] == 'credit':
-                    df_file['saldo'] = np.nan
-
-                df_generated = pd.concat([df_generated, df_file], ignore_index=True)
-            else:
-                continue
+        cuenta = self.file_classifier.match_account(filename)
+        if cuenta is None:
+            print(f"⚠️ No se encontró número de cuenta en {filename}, saltando archivo.")
+            return
 
-        # 4️⃣ If still empty after processing
-        if df_generated.empty:
-            df_generated = pd.DataFrame(columns=expected_columns + [
-                'Fecha', 'unique_concept', 'estado', 'file_name', 'file_date', 'saldo'
-            ])
+        rows = self.chunk_rows_for(file) if chunk_rows == 'auto' else chunk_rows
+        try:
+            if rows:
+                chunks = self.schema_plan.read_csv(file, parser=parser.name, chunksize=rows)
+            else:
+                chunks = [self.schema_plan.read_csv(file, parser=parser.name)]
+        except Exception as e:
+            print(f"⚠️ Error reading file {filename}: {e}, skipping.")
+            return
 
-        return df_generated
+        file_date = self.get_file_date(file)
+        try:
+            for df_file in chunks:
+                if list(df_file.columns) != expected_columns:
+                    return
+                df_file['cuenta'] = FrameMemory.constant(cuenta, df_file.index)
+                yield self.prepare_file_frame(df_file, parser, filename, file_date, value)
+        except Exception as e:
+            print(f"⚠️ Error reading file {filename}: {e}, skipping.")
+
+    def prepare_file_frame(self, df_file, parser, filename, file_date, value):
+        """Aplica el plan del parser a un bloque: fechas, llave, columnas fijas y nombres canónicos."""
+        df_file[parser.date_column], no_parseadas = Helper.parse_date_series(
+            df_file[parser.date_column], parser.date_formats or DATE_FORMATS)
+        if no_parseadas.any():
+            print(f"⚠️ {int(no_parseadas.sum())} fechas no reconocidas en {filename}, "
+                  f"renglones: {df_file.index[no_parseadas].tolist()[:10]}")
+        df_file['unique_concept'] = self.key_rules[parser.key_rule].derive(df_file[parser.concept_column])
+        # Mismo valor en todo el archivo: categóricas de un solo valor (código int8 por renglón)
+        df_file['estado'] = FrameMemory.constant(value, df_file.index)
+        df_file['file_name'] = FrameMemory.constant(filename, df_file.index)
+        df_file['file_date'] = FrameMemory.constant(file_date, df_file.index)
+
+        # Period por el calendario de cortes de la cuenta (abiertos y cerrados), ya como
+        # categórica; un débito cerrado es del mes de su estado de cuenta (file_name)
+        period = None
+        if parser.period_rule == 'month' and value == 'cerrado':
+            period = CutoffCalendar.period_from_filename(filename)
+        if period is not None:
+            df_file['period'] = FrameMemory.constant(period, df_file.index)
+        elif parser.period_rule:
+            calendario = self.calendar.for_account(df_file['cuenta'].iloc[0] if len(df_file) else None)
+            df_file['period'] = calendario.assign_period(df_file[parser.date_column], parser.period_rule)
+
+        if parser.rename:
+            df_file = df_file.rename(columns=parser.rename)
+        # Columnas que el banco no trae (p.ej. saldo en crédito)
+        for col in parser.null_columns:
+            dtype = 'Int64' if Money.is_money_column(col) else object
+            df_file[col] = pd.Series(pd.NA if dtype == 'Int64' else None, index=df_file.index, dtype=dtype)
+
+        return df_file
+
+    def stream_to_sql(self, conn, folder, estado, primary_keys):
+        """Sube los archivos de `folder` bloque por bloque; nunca hay más de un bloque en memoria."""
+        key, value = list(estado.items())[0]
+        table_name = self.TARGET_TABLES[(key, value)]
+        total = 0
+        for chunk in self.iter_dataframes_to_upload(folder, estado, chunk_rows='auto'):
+            chunk = self.column_normalization(chunk, self.kind_mappings[key])
+            self.upsert_dataframe(conn, chunk, "banorte_load", table_name, primary_keys)
+            total += len(chunk)
+        print(f"🌊 Streaming: {total} filas enviadas a banorte_load.{table_name}")
+        FrameMemory.report(f'streaming {table_name}', {})
+        return total
+
+    def chunk_rows_for(self, file, sample_rows=1000):
+        """
+        Renglones por bloque para respetar streaming_memory_mb: se mide el costo en memoria
+        de una muestra del archivo y se deja margen para las copias de la normalización.
+        """
+        limit_mb = self.data_access.get('streaming_memory_mb', 256)
+        try:
+            sample = pd.read_csv(file, nrows=sample_rows)
+            bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+        except Exception:
+            return sample_rows
+        return max(sample_rows, int(limit_mb * 1024 * 1024 / (bytes_per_row * self.STREAMING_COPY_FACTOR)))
 
-    def upsert_dataframe(self, conn, df: pd.DataFrame, schema: str, table_name: str, primary_keys: list, overwrite_all: bool = False):
-        df = df.copy()
+    def upsert_dataframe(self, conn, df: pd.DataFrame, schema: str, table_name: str, primary_keys: list, overwrite_all: bool = False, delta: bool = None):
+        """
+        Sube df a schema.table_name por COPY + un INSERT ... ON CONFLICT set-based.
+        Con delta (delta_upsert en config.yaml) el servidor quita de la staging los
+        renglones idénticos a los guardados antes del merge.
+        Regresa los conteos de insertados, actualizados y sin cambios.
+        """
+        if delta is None:
+            delta = self.data_access.get('delta_upsert', False)
+        # Una columna repetida tras el mapping (p.ej. saldo) se envía una sola vez
+        if df.columns.duplicated().any():
+            df = df.loc[:, ~df.columns.duplicated()]
 
         # Ensure PKs exist
         missing = [pk for pk in primary_keys if pk not in df.columns]
         if missing:
             raise ValueError(f"Primary keys not found in DataFrame columns: {missing}")
 
-        # Drop duplicates on PK
+        # Drop duplicates on PK (regresa un DataFrame nuevo, no hace falta otra copia)
         df = df.drop_duplicates(subset=primary_keys, keep="last")
-        df = df.where(pd.notnull(df), None)
-
-        null_markers = {"", "nat", "nan", "none", "null", "n/a", "<na>"}
-        for col in df.columns:
-            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
-                mask = df[col].apply(lambda v: isinstance(v, str) and v.strip().lower() in null_markers)
-                if mask.any():
-                    df.loc[mask, col] = None
-
-        cols = list(df.columns)
-        col_list_sql = ", ".join(cols)
-        pk_list_sql = ", ".join(primary_keys)
-
-        # Build the update clause for DO UPDATE SET
-        update_cols = [col for col in cols if col not in primary_keys]
-        update_clause = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_cols)
-        if overwrite_all == False:
-            insert_sql = f"""
-                INSERT INTO {schema}.{table_name} ({col_list_sql})
-                VALUES %s
-                ON CONFLICT ({pk_list_sql})
-                DO UPDATE SET {update_clause}
-            """
-        elif overwrite_all == True:
-            with conn.connection.cursor() as cur:
-                if overwrite_all:
-                    # 1) Vacía la tabla "abierta"
-                    # Si tienes FKs y te da error, cambia a DELETE FROM
-                    cur.execute(f"TRUNCATE TABLE {schema}.{table_name}")
-                    
-                    # 2) Inserta todo de nuevo
-                    insert_sql = f"""
-                        INSERT INTO {schema}.{table_name} ({col_list_sql})
-                        VALUES %s
-                    """
-        date_like_cols = {col for col in cols if 'fecha' in col or 'date' in col}
-        dummy_date = datetime(1900, 1, 1)
-
-        def sanitize_value(value, column_name):
-            if isinstance(value, (NaTType, NAType)):
-                return dummy_date if column_name in date_like_cols else None
-            if value is None:
-                return dummy_date if column_name in date_like_cols else None
-            if isinstance(value, pd.Timestamp):
-                return value.to_pydatetime()
-            if isinstance(value, str):
-                cleaned = value.strip()
-                lowered = cleaned.lower()
-                if lowered in null_markers:
-                    return dummy_date if column_name in date_like_cols else None
-                return cleaned
-            if pd.isna(value):
-                return dummy_date if column_name in date_like_cols else None
-            return value
 
-        total = len(df)
-        if total == 0:
-            print(f"-- No hay filas para upsert en {schema}.{table_name}.")
-            return
+        # Limpieza vectorizada por columna; el resultado va directo al COPY
+        df = self.staging_loader.sanitize(df)
+        # tx_key sobre los valores ya limpios, los mismos que guardará la tabla
+        if table_name in self.TX_KEY_TABLES:
+            df = TxKey.assign(df)
+            # Sumas por (cuenta, period) y tx_key de lo enviado, para verify_load
+            if self.verify_loads and len(df):
+                self.load_checksums[table_name] = LoadVerifier.combine(
+                    self.load_checksums.get(table_name), LoadVerifier.frame_checksums(df))
+                self.load_keys.setdefault(table_name, []).append(df['tx_key'].to_numpy(dtype='int64'))
 
+        total = len(df)
         raw_conn = conn.connection
         cur = raw_conn.cursor()
         try:
             if overwrite_all:
-                cur.execute(f"TRUNCATE TABLE {schema}.{table_name} RESTART IDENTITY CASCADE;")
-            values_iter = (
-                tuple(sanitize_value(val, col) for val, col in zip(row, cols))
-                for row in df.itertuples(index=False, name=None)
-            )
-            execute_values(cur, insert_sql, values_iter, page_size=10000)
+                # Foto completa (tablas abierto): se carga en la sombra y se publica al final
+                shadow = self.pending_swaps.get((schema, table_name)) or self.staging_loader.create_shadow(cur, schema, table_name)
+                self.staging_loader.copy_frame(cur, f"{schema}.{shadow}", df)
+                self.pending_swaps[(schema, table_name)] = shadow
+                print(f"OK {total} filas en {schema}.{shadow}, se publica como {schema}.{table_name} al confirmar.")
+                self.count_modified(table_name, total)
+                return {'insertados': total, 'actualizados': 0, 'sin_cambios': 0}
+
+            if total == 0:
+                print(f"-- No hay filas para upsert en {schema}.{table_name}.")
+                return {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0}
+
+            # 1) COPY a una tabla temporal con la estructura del destino
+            staging = self.staging_loader.create_staging(cur, schema, table_name)
+            enviados = self.staging_loader.copy_frame(cur, staging, df)
+
+            # Delta: sólo quedan en la staging los renglones nuevos o modificados
+            omitidos = 0
+            if delta:
+                omitidos = self.staging_loader.prune_unchanged(cur, schema, table_name, staging, list(df.columns), primary_keys)
+                enviados -= omitidos
+
+            # 2) Una sola sentencia set-based contra el destino
+            insertados, actualizados = self.staging_loader.merge(cur, schema, table_name, staging, list(df.columns), primary_keys)
+            self.staging_loader.drop_staging(cur, staging)
         finally:
             cur.close()  # commit y close los maneja SQLAlchemy
 
-        print(f"OK {total} filas upserted en {schema}.{table_name}")
+        resultado = {
+            'insertados': insertados,
+            'actualizados': actualizados,
+            'sin_cambios': enviados - insertados - actualizados + omitidos,
+        }
+        print(f"OK {total} filas en {schema}.{table_name}: {resultado['insertados']} insertadas, "
+              f"{resultado['actualizados']} actualizadas, {resultado['sin_cambios']} sin cambios")
+        self.count_modified(table_name, insertados + actualizados)
+        return resultado
+
+    def count_modified(self, table_name, filas):
+        """
+        Renglones escritos en esta corrida por tabla (y en su *_conceptos, vía trigger).
+        pg_stat_user_tables los refleja hasta que cada conexión reporta sus contadores,
+        así que el mantenimiento los usa como mínimo.
+        """
+        tablas = [table_name]
+        if table_name in self.TX_KEY_TABLES:
+            tablas.append(f"{table_name.split('_')[0]}_conceptos")
+        for tabla in tablas:
+            self.modified_rows[tabla] = self.modified_rows.get(tabla, 0) + filas
+
+    def prepare_shadows(self, engine, tables, schema="banorte_load"):
+        """
+        Crea vacías las tablas sombra de `tables` en una transacción corta y confirmada, para
+        que el lock que toman sus llaves foráneas sobre accounts no dure toda la carga.
+        """
+        with engine.begin() as conn:
+            cur = conn.connection.cursor()
+            try:
+                for table_name in tables:
+                    self.pending_swaps[(schema, table_name)] = self.staging_loader.create_shadow(cur, schema, table_name)
+            finally:
+                cur.close()
+
+    def publish_shadows(self, conn, tables=None):
+        """
+        Intercambia cada tabla sombra pendiente por su destino (ver StagingLoader.swap_shadow).
+        Con `tables` sólo publica esas, para que cada conexión publique las que cargó.
+        Regresa las publicadas; después del commit van a drop_previous_tables.
+        """
+        publicadas = []
+        cur = conn.connection.cursor()
+        try:
+            # list() copia las llaves de una vez: el otro carril puede estar publicando las suyas
+            for schema, table_name in [key for key in list(self.pending_swaps) if tables is None or key[1] in tables]:
+                shadow = self.pending_swaps.pop((schema, table_name))
+                self.staging_loader.swap_shadow(cur, schema, table_name, shadow)
+                publicadas.append((schema, table_name, shadow))
+                print(f"🔁 {schema}.{table_name} publicada desde {shadow}.")
+        finally:
+            cur.close()
+        return publicadas
+
+    def drop_previous_tables(self, engine, publicadas):
+        """Borra, ya confirmado el swap, las versiones anteriores de las tablas publicadas."""
+        if not publicadas:
+            return
+        with engine.begin() as conn:
+            cur = conn.connection.cursor()
+            try:
+                for schema, table_name, shadow in publicadas:
+                    self.staging_loader.drop_previous(cur, schema, table_name, shadow)
+            finally:
+                cur.close()
+
+    def run_maintenance(self, engine):
+        """
+        ANALYZE dirigido y foto de estadísticas de MAINTENANCE_TABLES en su propia
+        transacción (post_load_maintenance en config.yaml). Regresa el DataFrame de la foto.
+        """
+        if not self.data_access.get('post_load_maintenance', True):
+            return None
+        try:
+            with engine.begin() as conn:
+                return self.table_maintenance.run(conn, self.MAINTENANCE_TABLES, self.modified_rows)
+        except Exception as e:
+            print(f"⚠️ No se pudo correr el mantenimiento posterior a la carga: {e}")
+            return None
+
+    def verify_load(self, conn, table_name, target=None):
+        """
+        Compara las sumas acumuladas de lo que se subió a table_name con las de esos mismos
+        renglones (por tx_key) en la base o en `target`, su sombra. Regresa las particiones
+        que no cuadran.
+        """
+        esperado = self.load_checksums.pop(table_name, None)
+        keys = self.load_keys.pop(table_name, [])
+        if not self.verify_loads:
+            return None
+        keys = np.concatenate(keys) if keys else np.array([], dtype='int64')
+        return self.load_verifier.verify(conn, "banorte_load", table_name, esperado, keys, target)
+
+    def load_lane(self, conn, lane, loads, primary_keys, engine=None):
+        """
+        Corre en orden las cargas (tabla, DataFrame, overwrite_all) de un carril; con la
+        foto abierta promueve a cerrado lo que ya trae cerrado. Con `engine` cada tabla se
+        publica, se confirma y se anota en la bitácora al terminar; sin él el commit queda
+        a cargo de quien llama. Regresa sus tiempos.
+        """
+        tiempos = []
+        for table_name, df, overwrite_all in loads:
+            inicio = time.perf_counter()
+            self.upsert_dataframe(conn, df, "banorte_load", table_name, primary_keys, overwrite_all=overwrite_all)
+            shadow = self.pending_swaps.get(("banorte_load", table_name))
+            diferencias = self.verify_load(conn, table_name, shadow)
+            no_cuadran = None if diferencias is None else len(diferencias)
+            tiempos.append({'tabla': table_name, 'carril': lane, 'filas': len(df), 'no_cuadran': no_cuadran,
+                            'segundos': round(time.perf_counter() - inicio, 3)})
+            if overwrite_all:
+                # La promoción corre sobre la sombra, antes de publicarla
+                inicio = time.perf_counter()
+                resultado = self.closed_promotion.promote(conn, lane, shadow)
+                tiempos.append({'tabla': f"promoción {lane}", 'carril': lane, 'filas': resultado['promovidos'],
+                                'segundos': round(time.perf_counter() - inicio, 3)})
+            else:
+                self.ingest_ledger.record(conn, table_name)
+
+            if engine is not None:
+                publicadas = self.publish_shadows(conn, [table_name])
+                conn.commit()
+                self.drop_previous_tables(engine, publicadas)
+                self.journal.mark_done(f"load {table_name}", filas=len(df), no_cuadran=no_cuadran)
+        return tiempos
+
+    def mark_loads_done(self, tiempos, msi=True):
+        """Anota en la bitácora, ya confirmadas, las cargas de `tiempos` que faltan y (con msi) la de MSI."""
+        for tiempo in tiempos:
+            if 'no_cuadran' in tiempo and not self.journal.is_done(f"load {tiempo['tabla']}"):
+                self.journal.mark_done(f"load {tiempo['tabla']}", filas=tiempo['filas'], no_cuadran=tiempo['no_cuadran'])
+        if msi and not self.journal.is_done('load msi'):
+            self.journal.mark_done('load msi')
+
+    def load_concurrently(self, engine, connexion, lanes, primary_keys):
+        """
+        Cada carril corre en su propia conexión del pool mientras este hilo carga los MSI
+        en `connexion`; los viajes a la base de los carriles se traslapan entre sí y con ese
+        trabajo de CPU. Cada carril es todo-o-nada por sí mismo: publica sus sombras y
+        confirma en cuanto termina, así el rename sólo bloquea su propia tabla un instante.
+        Entre carriles no hay atomicidad: si uno falla, lo que ya confirmaron los otros (y
+        los MSI) se queda, queda anotado en la bitácora y con resume sólo se repite el que
+        falló. Regresa los tiempos por tabla de los carriles confirmados.
+        """
+        conexiones = {lane: engine.connect() for lane in lanes}
+
+        def cargar(lane):
+            conn = conexiones[lane]
+            tablas = [table_name for table_name, _, _ in lanes[lane]]
+            try:
+                # Las cargas usan el cursor crudo; sin begin() SQLAlchemy no tendría qué confirmar
+                conn.begin()
+                tiempos = self.load_lane(conn, lane, lanes[lane], primary_keys)
+                publicadas = self.publish_shadows(conn, tablas)
+                conn.commit()
+            except Exception:
+                # Las sombras sin publicar del carril se van con el rollback
+                for table_name in tablas:
+                    self.pending_swaps.pop(("banorte_load", table_name), None)
+                conn.rollback()
+                raise
+            return tiempos, publicadas
+
+        tiempos, publicadas, errores = [], [], {}
+        try:
+            with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+                futuros = {lane: executor.submit(cargar, lane) for lane in lanes}
+                if not self.journal.is_done('load msi'):
+                    try:
+                        self.load_msi(connexion)
+                        connexion.commit()
+                    except Exception as e:
+                        connexion.rollback()
+                        errores['msi'] = e
+            for lane, futuro in futuros.items():
+                try:
+                    tiempos_carril, publicadas_carril = futuro.result()
+                except Exception as e:
+                    errores[lane] = e
+                    continue
+                tiempos.extend(tiempos_carril)
+                publicadas += publicadas_carril
+        finally:
+            for conn in conexiones.values():
+                conn.close()
+        self.drop_previous_tables(engine, publicadas)
+        # La bitácora sólo registra lo que sí se confirmó
+        self.mark_loads_done(tiempos, msi='msi' not in errores)
+        if errores:
+            raise RuntimeError("; ".join(f"carril {lane}: {e}" for lane, e in errores.items()))
+        return tiempos
 
     def column_normalization(self, df_input, mapping_dict):
         # Renombrar columnas según el mapping
@@ -315,19 +933,12 @@ class CSV_TO_SQL:
         return df_input
     
     def parse_fecha(self, value):
-        formats = ['%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S']
-        for fmt in formats:
-            try:
-                dt = pd.to_datetime(value, format=fmt, errors='coerce')
-                return dt.date()  # Devuelve solo la fecha, sin hora
-            except (ValueError, TypeError):
-                continue
-
-        # Fallback
-        dt = pd.to_datetime(value, errors='coerce')
+        # Versión escalar; el ingest usa Helper.parse_date_series sobre la columna completa
+        fechas, _ = Helper.parse_date_series(pd.Series([value]))
+        dt = fechas.iloc[0]
         if pd.isna(dt):
             return pd.NaT
-        return dt.date()
+        return dt.date()  # Devuelve solo la fecha, sin hora
 
     def get_file_date(self, file):
         try:
@@ -348,6 +959,13 @@ class CSV_TO_SQL:
         except Exception as e:
             print(f"❌ Error connecting to database: {e}")
             return None
+
+    def get_file_hash(self, file):
+        # Los pases de débito y crédito recorren la misma carpeta; el hash se calcula una vez
+        file_path = os.path.abspath(file)
+        if file_path not in self._file_hashes:
+            self._file_hashes[file_path] = IngestLedger.file_hash(file_path)
+        return self._file_hashes[file_path]
     
     def get_file_date(self, file):
         """
@@ -376,91 +994,132 @@ class CSV_TO_SQL:
             print(f"⚠️ Error obteniendo fecha de creación de {file}: {e}")
             return pd.NaT
 
-    def sql_to_excel_export(self):
-        print("Exportando datos con conceptos del servidor SQL a Excel local...")
-
-        connexion = self.sql_conexion(self.data_access['sql_workflow']).connect()
-        if connexion is None:
-            print("❌ No se pudo establecer conexión con SQL Server.")
-            return False
-
-        debit_query = """
-            WITH debito AS (
+    def export_query(self, familia, periods=None, cuentas=None):
+        """UNION de cerrado y abierto de `familia` con sus conceptos, filtrado por period y cuenta."""
+        filtros = []
+        if periods:
+            filtros.append("period = ANY(%(periods)s)")
+        if cuentas:
+            filtros.append("cuenta = ANY(%(cuentas)s)")
+        # El filtro va dentro de cada rama para que use los índices de cada tabla
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        columnas = """fecha, concepto, cargo, abono, saldo, file_date, file_name,
+                    estado, cuenta, unique_concept, period"""
+        # tx_key sólo sirve para el cruce con conceptos; no sale en el Excel
+        return f"""
+            WITH movimientos AS (
                 SELECT 
-                    fecha, concepto, cargo, abono, saldo, file_date, file_name,
-                    estado, cuenta, unique_concept, period
-                FROM banorte_load.debito_cerrado
+                    {columnas}, tx_key
+                FROM banorte_load.{familia}_cerrado
+                {where}
 
                 UNION ALL
 
                 SELECT 
-                    fecha, concepto, cargo, abono, saldo, file_date, file_name,
-                    estado, cuenta, unique_concept, period
-                FROM banorte_load.debito_abierto
+                    {columnas}, tx_key
+                FROM banorte_load.{familia}_abierto
+                {where}
             )
             SELECT 
-                d.*,
+                {", ".join(f"m.{col.strip()}" for col in columnas.split(","))},
                 c.category_group,
                 c.category_subgroup,
                 c.beneficiario
-            FROM debito d
-            LEFT JOIN banorte_load.debito_conceptos c
-                ON  d.fecha = c.fecha
-                AND d.cargo = c.cargo
-                AND d.abono = c.abono
-                AND d.unique_concept = c.unique_concept
-            ORDER BY d.fecha DESC;
-        """
-
-        df_debit = pd.read_sql(debit_query, connexion)
-        query_credit = """
-                    WITH credito AS (
-                        SELECT 
-                            fecha, concepto, cargo, abono, saldo, file_date, file_name,
-                            estado, cuenta, unique_concept, period
-                        FROM banorte_load.credito_cerrado
-
-                        UNION ALL
-
-                        SELECT 
-                            fecha, concepto, cargo, abono, saldo, file_date, file_name,
-                            estado, cuenta, unique_concept, period
-                        FROM banorte_load.credito_abierto
-                    )
-                    SELECT 
-                        credito.*,
-                        credito_conceptos.category_group,
-                        credito_conceptos.category_subgroup,
-                        credito_conceptos.beneficiario
-                    FROM credito
-                    LEFT JOIN banorte_load.credito_conceptos AS credito_conceptos
-                        ON  credito.fecha = credito_conceptos.fecha
-                        AND credito.cargo = credito_conceptos.cargo
-                        AND credito.abono = credito_conceptos.abono
-                        AND credito.unique_concept = credito_conceptos.unique_concept
-                    ORDER BY credito.fecha DESC;        
-            """
-        df_credit = pd.read_sql(query_credit, connexion)
-
-        print(df_credit.head())
+            FROM movimientos m
+            LEFT JOIN banorte_load.{familia}_conceptos c
+                ON  m.tx_key = c.tx_key
+            ORDER BY m.fecha DESC
+        """
+
+    def sql_to_excel_export(self, periods=None, cuentas=None, chunk_rows=None):
+        """
+        Exporta movimientos con conceptos a ~/Downloads/SQL_bank_data.xlsx (hojas df_credit y
+        df_debit). Cada consulta se lee con un cursor con nombre (del lado del servidor) en
+        bloques de chunk_rows (export_chunk_rows en config.yaml) que se agregan a un libro
+        write-only de openpyxl, así que la memoria no crece con los años exportados.
+        periods y cuentas limitan la exportación. Regresa {hoja: renglones}.
+        """
+        print("Exportando datos con conceptos del servidor SQL a Excel local...")
+
+        engine = self.sql_conexion(self.data_access['sql_workflow'])
+        if engine is None:
+            print("❌ No se pudo establecer conexión con SQL Server.")
+            return False
+        chunk_rows = chunk_rows or self.data_access.get('export_chunk_rows', 20000)
+        params = {'periods': list(periods or []), 'cuentas': [str(c) for c in cuentas or []]}
+
         # Ruta final del archivo
         home = os.path.expanduser("~")
         output_path = os.path.join(home, "Downloads", "SQL_bank_data.xlsx")
 
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df_credit.to_excel(writer, sheet_name="df_credit", index=False)
-            df_debit.to_excel(writer, sheet_name="df_debit", index=False)
+        inicio = time.perf_counter()
+        workbook = Workbook(write_only=True)
+        filas = {}
+        raw_conn = engine.raw_connection()
+        try:
+            for familia, sheet_name in self.EXPORT_SHEETS:
+                sheet = workbook.create_sheet(sheet_name)
+                with raw_conn.cursor(name=f"export_{familia}") as cur:
+                    cur.itersize = chunk_rows
+                    cur.execute(self.export_query(familia, periods, cuentas), params)
+                    # En un cursor con nombre las columnas se conocen hasta el primer bloque
+                    bloque = cur.fetchmany(chunk_rows)
+                    sheet.append([col.name for col in cur.description])
+                    filas[sheet_name] = 0
+                    while bloque:
+                        for row in bloque:
+                            sheet.append(row)
+                        filas[sheet_name] += len(bloque)
+                        bloque = cur.fetchmany(chunk_rows)
+            workbook.save(output_path)
+        except Exception as e:
+            print(f"❌ Error exportando a Excel: {e}")
+            return False
+        finally:
+            raw_conn.close()
 
+        print(f"📤 {filas} renglones en {time.perf_counter() - inicio:.2f}s")
         print(f"Archivo guardado correctamente en: {output_path}")
+        return filas
 
-
-        return df_debit
     def __init__(self, working_folder, data_access):
         self.today = date.today()
         self.working_folder = working_folder
         self.data_access = data_access
         self.current_folder = os.path.join(self.working_folder,'Info Bancaria', f'{self.today.year}-{self.today.month:02d}')
         self.closed_folder = os.path.join(self.working_folder,'Info Bancaria', 'Meses cerrados', 'Repositorio por mes')
+        self.ingest_ledger = IngestLedger("banorte_load")
+        self._file_hashes = {}
+        self.concept_keys = ConceptKeyCache(os.path.join(self.working_folder, 'Info Bancaria', 'unique_concept_cache.pkl'))
+        # Regla de unique_concept por nombre (BankParser.key_rule)
+        self.key_rules = {'digits_or_letters': self.concept_keys}
+        # Parsers por banco/producto: se compilan una vez y se eligen por encabezado
+        self.parsers = ParserRegistry(self.data_access)
+        self.kind_mappings = {kind: {col: col for col in self.parsers.columns_for(kind)} for kind in BankParser.KINDS}
+        self.msi_schedule = MsiSchedule("banorte_load")
+        # COPY + pyarrow para lecturas grandes, pd.read_sql para las chicas
+        self.sql_reader = SqlReader(self.data_access.get('fast_read_min_rows', 10000))
+        self.closed_promotion = ClosedPromotion("banorte_load")
+        # Verificación por checksums después de cada carga (verify_loads en config.yaml)
+        self.verify_loads = self.data_access.get('verify_loads', True)
+        self.load_verifier = LoadVerifier()
+        self.load_checksums = {}
+        self.load_keys = {}
+        # ANALYZE sólo de las tablas que cruzaron el umbral de renglones modificados
+        self.table_maintenance = TableMaintenance(
+            "banorte_load",
+            analyze_min_rows=self.data_access.get('analyze_min_rows', 500),
+            analyze_scale_factor=self.data_access.get('analyze_scale_factor', 0.05),
+            vacuum_dead_ratio=self.data_access.get('vacuum_dead_ratio', 0.2))
+        self.modified_rows = {}
+        # Bitácora de etapas de csv_to_sql_process para --resume
+        self.journal = RunJournal(os.path.join(self.working_folder, 'Info Bancaria', 'run_journal'))
+        self.staging_loader = StagingLoader()
+        # Tablas sombra cargadas con overwrite_all, pendientes de publicar antes del commit
+        self.pending_swaps = {}
+        self.calendar = CutoffCalendar()
+        self.schema_plan = SchemaPlan(self.parsers)
+        self.file_classifier = FileClassifier(self.parsers, cache_path=os.path.join(self.working_folder, 'Info Bancaria', 'file_classifier_cache.pkl'))
         
 if __name__ == "__main__":
     env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -471,5 +1130,25 @@ if __name__ == "__main__":
     yaml_path = os.path.join(working_folder, 'config.yaml')
     with open(yaml_path, 'r') as file:
         data_access = yaml.safe_load(file)
+    parser = argparse.ArgumentParser(description="Carga de CSV de Banorte a banorte_load")
+    parser.add_argument("--backfill", action="store_true", help="Carga histórica de cerrados en paralelo")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para --backfill (default: núcleos)")
+    parser.add_argument("--full-reload", action="store_true", help="Ignora el ledger y reprocesa todos los cerrados")
+    parser.add_argument("--streaming", action="store_true", help="Sube los cerrados por bloques")
+    parser.add_argument("--concurrente", action="store_true", help="Carga débito y crédito en conexiones paralelas")
+    parser.add_argument("--resume", action="store_true", help="Retoma la corrida interrumpida en la primera etapa incompleta")
+    parser.add_argument("--exportar-excel", action="store_true", help="Exporta movimientos con conceptos a Excel")
+    parser.add_argument("--periodos", nargs="+", default=None, help="Filtra --exportar-excel por period (YYYY-MM)")
+    parser.add_argument("--cuentas", nargs="+", default=None, help="Filtra --exportar-excel por cuenta")
+    parser.add_argument("--msi-proyeccion", type=int, default=None, metavar="MESES", help="Muestra las mensualidades MSI de los próximos MESES")
+    args = parser.parse_args()
+
     app = CSV_TO_SQL(working_folder, data_access)
-    app.csv_to_sql_process()
\ No newline at end of file
+    if args.msi_proyeccion:
+        app.msi_projection(args.msi_proyeccion)
+    elif args.exportar_excel:
+        app.sql_to_excel_export(periods=args.periodos, cuentas=args.cuentas)
+    elif args.backfill:
+        app.backfill(workers=args.workers, full_reload=args.full_reload)
+    else:
+        app.csv_to_sql_process(full_reload=args.full_reload, streaming=args.streaming or None, concurrent=args.concurrente or None, resume=args.resume)
\ No newline at end of file
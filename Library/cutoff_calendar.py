@@ -0,0 +1,150 @@
+import re
+import numpy as np
+import pandas as pd
+
+try:
+    from Library.sql_reader import SqlReader
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from sql_reader import SqlReader
+
+
+class CutoffCalendar:
+    """
+    Fechas de corte de banorte_load.cutoff_days cargadas una sola vez en un arreglo
+    ordenado. Las consultas son búsquedas binarias vectorizadas (np.searchsorted) sobre
+    ese arreglo, sin consultas por renglón.
+    Cada cuenta tiene su propio calendario (for_account): los cortes de sus periodos en
+    banorte_load.account_cutoffs y, después del último, los de cutoff_days.
+    Si una fecha cae fuera de lo que hay en la tabla, el calendario se extiende con cortes
+    sintéticos en el mismo día que usa populate_cutoff_days.
+
+    El period de un movimiento depende de la regla de su cuenta:
+    - 'cutoff' (crédito): periodo del primer corte de la cuenta >= fecha.
+    - 'month' (débito): mes calendario de la fecha, igual que refresh_account_cutoffs;
+      en archivos cerrados manda el mes del estado de cuenta en file_name (period_from_filename).
+    """
+    # populate_cutoff_days genera los cortes el día 6 de cada mes
+    DEFAULT_CUTOFF_DAY = 6
+    PERIOD_RULES = ('cutoff', 'month')
+
+    def __init__(self, fechas=(), periodos=(), cuentas=None):
+        df = pd.DataFrame({
+            'fecha': pd.to_datetime(pd.Series(list(fechas), dtype=object)),
+            'periodo': pd.Series(list(periodos), dtype=object),
+        }).dropna(subset=['fecha'])
+        df = df.sort_values('fecha').drop_duplicates('fecha')
+        self.fechas = df['fecha'].to_numpy(dtype='datetime64[D]')
+        self.periodos = df['periodo'].astype(str).to_numpy(dtype=object)
+        # cuenta -> (fechas, periodos) de account_cutoffs; los calendarios se arman al pedirlos
+        self.account_cutoffs = {}
+        self.accounts = {}
+        if cuentas is not None and len(cuentas):
+            for cuenta, grupo in cuentas.dropna(subset=['fecha']).groupby('account_number', sort=False):
+                self.account_cutoffs[str(cuenta)] = (grupo['fecha'], grupo['periodo'])
+
+    @classmethod
+    def load(cls, conn, schema='banorte_load', reader=None):
+        """
+        Lee cutoff_days y los cortes de cada cuenta (account_cutoffs con su fecha en
+        cutoff_days); si las tablas no existen regresa un calendario vacío (sólo sintético).
+        """
+        reader = reader or SqlReader()
+        try:
+            df = reader.read(conn, f"SELECT fecha, periodo FROM {schema}.cutoff_days ORDER BY fecha")
+            df_cuentas = reader.read(conn, f"""
+                SELECT c.account_number, d.fecha, c.cutoff_period AS periodo
+                FROM {schema}.account_cutoffs c
+                JOIN {schema}.cutoff_days d ON d.periodo = c.cutoff_period
+                ORDER BY c.account_number, d.fecha
+            """)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer {schema}.cutoff_days, se usan cortes el día {cls.DEFAULT_CUTOFF_DAY}: {e}")
+            conn.rollback()
+            return cls()
+        print(f"📅 Calendario de cortes: {len(df)} fechas, {df_cuentas['account_number'].nunique()} cuentas.")
+        return cls(df['fecha'], df['periodo'], df_cuentas)
+
+    def for_account(self, cuenta):
+        """
+        Calendario de `cuenta`: sus cortes de account_cutoffs y, después del último, los
+        generales (account_cutoffs sólo guarda periodos ya vencidos). Una cuenta sin
+        registros usa el calendario general. Se arma una vez por cuenta.
+        """
+        cuenta = None if cuenta is None else str(cuenta)
+        if cuenta not in self.account_cutoffs:
+            return self
+        if cuenta not in self.accounts:
+            fechas, periodos = self.account_cutoffs[cuenta]
+            propio = CutoffCalendar(fechas, periodos)
+            despues = self.fechas > propio.fechas[-1]
+            propio.fechas = np.concatenate([propio.fechas, self.fechas[despues]])
+            propio.periodos = np.concatenate([propio.periodos, self.periodos[despues]])
+            self.accounts[cuenta] = propio
+        return self.accounts[cuenta]
+
+    @staticmethod
+    def period_from_filename(filename):
+        """Period 'YYYY-MM' del nombre del archivo (estado de cuenta cerrado) o None."""
+        encontrado = re.search(r'(\d{4}-\d{2})', str(filename))
+        return encontrado.group(1) if encontrado else None
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def cover(self, desde, hasta):
+        """
+        Agrega cortes sintéticos a cada mes de [desde, hasta] (con un mes de margen) que no
+        tenga corte en la tabla, también a los huecos intermedios: si faltara uno, la
+        búsqueda asignaría el period del siguiente corte existente.
+        """
+        meses = np.arange(np.datetime64(desde, 'M') - 1, np.datetime64(hasta, 'M') + 2)
+        if len(self.fechas):
+            meses = meses[~np.isin(meses, self.fechas.astype('datetime64[M]'))]
+        if not len(meses):
+            return self
+        nuevas = meses.astype('datetime64[D]') + (self.DEFAULT_CUTOFF_DAY - 1)
+        fechas = np.concatenate([self.fechas, nuevas])
+        periodos = np.concatenate([self.periodos, np.datetime_as_string(meses, unit='M').astype(object)])
+        orden = np.argsort(fechas, kind='stable')
+        self.fechas, self.periodos = fechas[orden], periodos[orden]
+        return self
+
+    def next_cutoff_index(self, fechas):
+        """Índice del primer corte >= cada fecha."""
+        valores = pd.to_datetime(pd.Series(fechas)).to_numpy(dtype='datetime64[D]')
+        return np.searchsorted(self.fechas, valores, side='left')
+
+    def cutoffs_at(self, indices):
+        """(fechas de corte, periodos) para un arreglo de índices del calendario."""
+        indices = np.asarray(indices, dtype='int64')
+        if len(indices) and indices.max() >= len(self.fechas):
+            raise IndexError("El calendario no cubre todos los cortes pedidos; llama cover() antes")
+        return self.fechas[indices], self.periodos[indices]
+
+    def assign_period(self, fechas, rule='cutoff'):
+        """
+        Period de cada fecha como categórica alineada a `fechas` (NaT → <NA>).
+        Una sola búsqueda binaria para toda la columna: O(n log k) con k cortes.
+        """
+        if rule not in self.PERIOD_RULES:
+            raise ValueError(f"Regla de period '{rule}' no soportada, usa una de {self.PERIOD_RULES}")
+        serie = pd.Series(fechas)
+        valores = pd.to_datetime(serie).to_numpy(dtype='datetime64[D]')
+        validas = ~np.isnat(valores)
+        codes = np.full(len(valores), -1, dtype='int64')
+        if not validas.any():
+            return pd.Series(pd.Categorical.from_codes(codes, categories=[]), index=serie.index)
+
+        if rule == 'month':
+            meses, inversa = np.unique(valores[validas].astype('datetime64[M]'), return_inverse=True)
+            etiquetas = np.datetime_as_string(meses, unit='M').astype(object)
+        else:
+            self.cover(valores[validas].min(), valores[validas].max())
+            indices, inversa = np.unique(np.searchsorted(self.fechas, valores[validas], side='left'), return_inverse=True)
+            etiquetas = self.periodos[indices]
+
+        # Dos cortes con la misma etiqueta comparten categoría
+        categorias, por_etiqueta = np.unique(etiquetas.astype(str), return_inverse=True)
+        codes[validas] = por_etiqueta[inversa]
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categorias), index=serie.index)
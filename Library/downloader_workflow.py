@@ -10,9 +10,11 @@ import os, glob
 
 try:
     from Library.web_automation import WebAutomation
+    from Library.sql_reader import SqlReader
 except ModuleNotFoundError:
     # fallback if running inside the Library folder
     from web_automation import WebAutomation
+    from sql_reader import SqlReader
 from urllib.parse import urlparse
 import psycopg2
 from colorama import Fore, Style, init
@@ -27,6 +29,7 @@ class DownloaderWorkflow:
         self.closed_folder = os.path.join(self.working_folder,'Info Bancaria', 'Meses cerrados', 'Repositorio por mes')
         self.temporal_downloads = os.path.join(self.working_folder, 'Info Bancaria', 'Descargas temporales')
         self.web_automation = WebAutomation(self.working_folder, self.data_access)
+        self.sql_reader = SqlReader(self.data_access.get('fast_read_min_rows', 10000))
         print("Arhivos CSV", glob.glob(os.path.join(self.temporal_downloads, "*.csv")))
 
     def download_missing_files(self):
@@ -43,9 +46,9 @@ class DownloaderWorkflow:
             # Periodos cerrados
             period_debit = "SELECT DISTINCT period, cuenta FROM banorte_load.debito_cerrado;"
             period_credit = "SELECT DISTINCT period, cuenta FROM banorte_load.credito_cerrado;"
-            self.df_account_cutoffs = pd.read_sql(cutofss, connexion)
-            self.periods_debit = pd.read_sql(period_debit, connexion)
-            self.periods_credit = pd.read_sql(period_credit, connexion)
+            self.df_account_cutoffs = self.sql_reader.read(connexion, cutofss)
+            self.periods_debit = self.sql_reader.read(connexion, period_debit)
+            self.periods_credit = self.sql_reader.read(connexion, period_credit)
 
             self.df_account_cutoffs.sort_values(['account_number', 'type', 'cutoff_period'], ascending=[True, True, False], inplace=True)
             top_two = (
@@ -82,7 +85,7 @@ class DownloaderWorkflow:
             today = pd.Timestamp(self.today)
             # dataframe cuentas
             accounts_query = "SELECT * FROM banorte_load.accounts"
-            df_accounts = pd.read_sql(accounts_query, connexion)
+            df_accounts = self.sql_reader.read(connexion, accounts_query)
             print(df_accounts.head())
 
             debit_accounts = df_accounts[df_accounts['type'] == 'debit']['account_number'].astype(str).tolist()
@@ -110,8 +113,8 @@ class DownloaderWorkflow:
             query_debit = "SELECT cuenta, MAX(file_date) AS max_date FROM banorte_load.debito_abierto GROUP BY cuenta;"
             query_credit = "SELECT cuenta, MAX(file_date) AS max_date FROM banorte_load.credito_abierto GROUP BY cuenta;"
 
-            df_open_debit = pd.read_sql(query_debit, connexion)
-            df_open_credit = pd.read_sql(query_credit, connexion)
+            df_open_debit = self.sql_reader.read(connexion, query_debit)
+            df_open_credit = self.sql_reader.read(connexion, query_credit)
 
             # ⚠️ Corregido: debe ser lista, no dict
             files_and_dates = []
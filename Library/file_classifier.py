@@ -0,0 +1,114 @@
+import csv
+import os
+import pickle
+import re
+
+
+class FileClassifier:
+    """
+    Clasifica los CSV que llegan del banco sin leerlos completos:
+    - Cuenta: un solo patrón compilado con todas las cuentas de banorte_load.accounts;
+      si varias aparecen en el nombre del archivo gana la más larga.
+    - Parser (banorte_debit, banorte_credit, ...): se leen sólo los bytes del encabezado
+      y se comparan contra las firmas del ParserRegistry.
+    El parser se guarda en cache por (ruta, mtime, tamaño).
+    """
+    CACHE_VERSION = 2
+    HEADER_BYTES = 64 * 1024
+
+    def __init__(self, registry, accounts=None, cache_path=None):
+        self.registry = registry
+        self.signatures = dict(registry.signatures)
+        self.cache_path = cache_path
+        self.verdicts = {}
+        self._dirty = False
+        self._pattern = None
+        self._load()
+        if accounts is not None:
+            self.set_accounts(accounts)
+
+    def set_accounts(self, accounts):
+        cuentas = sorted({str(acc) for acc in accounts if str(acc)}, key=len, reverse=True)
+        if not cuentas:
+            self._pattern = None
+            return
+        # Lookahead para encontrar coincidencias traslapadas (p.ej. '123' y '2345' en '12345')
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, cuentas)) + '))')
+
+    def match_account(self, filename):
+        """Cuenta contenida en el nombre del archivo; si hay varias, la más larga."""
+        if self._pattern is None:
+            return None
+        candidatos = [(m.group(1), m.start()) for m in self._pattern.finditer(filename)]
+        if not candidatos:
+            return None
+
+        def aislada(candidato):
+            cuenta, inicio = candidato
+            antes = filename[inicio - 1] if inicio > 0 else ''
+            despues = filename[inicio + len(cuenta)] if inicio + len(cuenta) < len(filename) else ''
+            return not antes.isalnum() and not despues.isalnum()
+
+        # Más larga primero; a igual longitud, la que no está pegada a otros caracteres
+        return max(candidatos, key=lambda c: (len(c[0]), aislada(c), -c[1]))[0]
+
+    @classmethod
+    def read_header(cls, path):
+        """Encabezados del CSV leyendo sólo el inicio del archivo."""
+        with open(path, 'rb') as f:
+            raw = f.read(cls.HEADER_BYTES)
+        first_line = raw.split(b'\n', 1)[0].rstrip(b'\r')
+        try:
+            line = first_line.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            line = first_line.decode('latin-1')
+        return next(csv.reader([line]), [])
+
+    def classify(self, path):
+        """Nombre del parser del archivo o None si el encabezado no coincide con ninguno."""
+        file_path = os.path.abspath(path)
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            print(f"⚠️ No se pudo leer {os.path.basename(path)}: {e}")
+            return None
+        cache_key = (file_path, stat.st_mtime_ns, stat.st_size)
+        if cache_key in self.verdicts:
+            return self.verdicts[cache_key]
+
+        try:
+            verdict = self.signatures.get(tuple(self.read_header(file_path)))
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el encabezado de {os.path.basename(path)}: {e}")
+            return None
+        self.verdicts[cache_key] = verdict
+        self._dirty = True
+        return verdict
+
+    def parser_for(self, path):
+        """BankParser del archivo o None."""
+        return self.registry.get(self.classify(path))
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                payload = pickle.load(f)
+            if payload.get('version') == self.CACHE_VERSION and payload.get('signatures') == self.signatures:
+                self.verdicts = payload.get('verdicts', {})
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el cache de clasificación {self.cache_path}: {e}")
+
+    def save(self):
+        if not self.cache_path or not self._dirty:
+            return
+        try:
+            carpeta = os.path.dirname(self.cache_path)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            with open(self.cache_path, 'wb') as f:
+                pickle.dump({'version': self.CACHE_VERSION, 'signatures': self.signatures, 'verdicts': self.verdicts}, f)
+            self._dirty = False
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cache de clasificación: {e}")
@@ -0,0 +1,82 @@
+import sys
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Windows no tiene el módulo resource; el reporte omite el pico de RSS
+    resource = None
+
+
+class FrameMemory:
+    """
+    Representación compacta de las columnas que repiten el mismo valor en cada renglón
+    del ingest (cuenta, estado, period, file_name, file_date). Se guardan como categóricas:
+    un código int8/int16 por renglón más un diccionario con los pocos valores distintos.
+    Se mantienen así durante lectura, concatenación, normalización y export, y sólo se
+    expanden en la frontera con la base (StagingLoader.sanitize) o con Sheets.
+    """
+    COMPACT_COLUMNS = ('cuenta', 'estado', 'period', 'file_name', 'file_date')
+
+    @staticmethod
+    def constant(value, index):
+        """Columna categórica con el mismo valor en todos los renglones de `index`."""
+        codes = np.zeros(len(index), dtype='int8')
+        return pd.Series(pd.Categorical.from_codes(codes, categories=[value]), index=index)
+
+    @staticmethod
+    def compact(df, columns=COMPACT_COLUMNS):
+        """Convierte a categóricas las columnas de `columns` presentes en df."""
+        for col in columns:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        return df
+
+    @staticmethod
+    def concat(frames):
+        """
+        pd.concat que conserva las categóricas: si los bloques traen categorías distintas
+        (un archivo por cuenta) pandas regresaría object, así que antes se igualan las
+        categorías de cada bloque a la unión, lo que sólo recodifica los códigos.
+        """
+        frames = [df for df in frames if df is not None]
+        if not frames:
+            return pd.DataFrame()
+        categoricas = [
+            col for col in dict.fromkeys(frames[0].columns)
+            if all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames)
+        ]
+        for col in categoricas:
+            union = pd.Index([])
+            for df in frames:
+                union = union.append(df[col].cat.categories)
+            union = union.unique()
+            for df in frames:
+                if not df[col].cat.categories.equals(union):
+                    df[col] = df[col].cat.set_categories(union)
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def peak_rss_mb():
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB; macOS, bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    @staticmethod
+    def report(stage, frames):
+        """Imprime la memoria (deep) de cada DataFrame de `frames` y el pico de RSS del proceso."""
+        detalle = []
+        total = 0
+        for name, df in frames.items():
+            if df is None:
+                continue
+            mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+            total += mb
+            detalle.append(f"{name}={mb:.1f}MB")
+        peak = FrameMemory.peak_rss_mb()
+        peak_txt = f", pico RSS {peak:.0f}MB" if peak is not None else ""
+        print(f"🧠 Memoria [{stage}]: {total:.1f}MB ({', '.join(detalle) or 'sin datos'}){peak_txt}")
+        return total
@@ -3,8 +3,34 @@ import pickle
 import subprocess
 import pandas as pd
 
+try:
+    from Library.file_classifier import FileClassifier
+    from Library.schema_plan import SchemaPlan
+    from Library.money import Money
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from file_classifier import FileClassifier
+    from schema_plan import SchemaPlan
+    from money import Money
+
+# Formatos de fecha que aparecen en los CSV de Banorte, en orden de preferencia
+DATE_FORMATS = (
+    '%d/%m/%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%dT%H:%M:%S',
+)
+DATE_NULL_MARKERS = ('', 'nan', 'nat', 'none', 'null', '<na>')
+DATE_SAMPLE_SIZE = 50
+
 
 class Helper:
+    @staticmethod
+    def read_csv_pesos(path):
+        """
+        CSV leído con el plan de su parser pero con los montos en pesos (float), como los
+        guardan merged_file.csv y los pickles; los centavos sólo viven en la carga a SQL.
+        """
+        return Money.frame_to_float(SchemaPlan.default().read_csv(path))
+
     @staticmethod
     def message_print(message):
         """Formatea mensajes con asteriscos para destacarlos"""
@@ -193,10 +219,9 @@ class Helper:
         return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
     @staticmethod
     def get_file_headers(file_path):
-        import pandas as pd
         try:
-            df = pd.read_csv(file_path, nrows=1)
-            return df.columns.tolist()
+            # Sólo se leen los bytes del encabezado
+            return FileClassifier.read_header(file_path)
         except Exception as e:
             print(f"Error al leer el archivo {file_path}: {e}")
             return []
@@ -220,7 +245,7 @@ class Helper:
                 return file_paths[0]
 
             # Fusionar múltiples archivos
-            dfs = [pd.read_csv(file) for file in file_paths]
+            dfs = [Helper.read_csv_pesos(file) for file in file_paths]
             merged_df = pd.concat(dfs, ignore_index=True)
             merged_file_path = os.path.join(os.path.dirname(file_paths[0]), "merged_file.csv")
             merged_df.to_csv(merged_file_path, index=False)
@@ -302,7 +327,7 @@ class Helper:
                     return
     
             # Load the CSV file into a DataFrame
-            df_debito = pd.read_csv(path_debito)
+            df_debito = Helper.read_csv_pesos(path_debito)
             print(f"✅ Archivo origen cargado: {path_debito}")
     
             # Add 'file_date' and 'file_name' columns
@@ -350,8 +375,7 @@ class Helper:
             csv_grupo = []
             for file in csv_files:
                 try:
-                    df = pd.read_csv(file, nrows=1)
-                    if set(columns).issubset(df.columns):
+                    if set(columns).issubset(FileClassifier.read_header(file)):
                         csv_grupo.append(file)
                 except Exception as e:
                     print(f"❌ Error al leer columnas del archivo {file}: {e}")
@@ -370,7 +394,7 @@ class Helper:
             for file in csv_grupo:
                 try:
                     # Load the CSV file
-                    df = pd.read_csv(file)
+                    df = Helper.read_csv_pesos(file)
                     print(f"📄 Procesando archivo: {file}")
 
                     # Exclude 'file_name' and 'file_date' from the comparison
@@ -405,45 +429,78 @@ class Helper:
         except Exception as e:
             print(f"❌ Error en feed_new_pickles: {e}")
     @staticmethod
+    def parse_date_series(serie, formatos=DATE_FORMATS):
+        """
+        Motor columnar de fechas: convierte una Serie completa a datetime64 (truncada al día)
+        en pocas pasadas vectorizadas, una por formato, en lugar de una llamada por renglón.
+        Los formatos se ordenan según una muestra de la columna para que el caso común
+        se resuelva en la primera pasada. Lo que no encaja en ningún formato pasa por un
+        intento final en modo 'mixed', siempre día primero como los archivos de Banorte
+        (salvo los textos que empiezan con el año, que se leen año-mes-día).
+
+        Regresa (fechas, no_parseadas): la Serie convertida y una máscara booleana con los
+        renglones que traían un valor pero no pudieron interpretarse.
+        """
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            fechas = serie.dt.floor('D')
+            return fechas, pd.Series(False, index=serie.index)
+
+        texto = serie.astype('string').str.strip()
+        vacios = texto.isna() | texto.str.lower().isin(DATE_NULL_MARKERS)
+        fechas = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+        pendientes = ~vacios
+
+        # Detectar el formato dominante con una muestra de la columna
+        muestra = texto[pendientes].head(DATE_SAMPLE_SIZE)
+        if not muestra.empty:
+            aciertos = {
+                fmt: pd.to_datetime(muestra, format=fmt, errors='coerce').notna().sum()
+                for fmt in formatos
+            }
+            formatos = sorted(formatos, key=lambda fmt: -aciertos[fmt])
+
+        for fmt in formatos:
+            if not pendientes.any():
+                break
+            convertidas = pd.to_datetime(texto[pendientes], format=fmt, errors='coerce')
+            convertidas = convertidas[convertidas.notna()]
+            fechas.loc[convertidas.index] = convertidas
+            pendientes.loc[convertidas.index] = False
+
+        if pendientes.any():
+            # Con dayfirst el modo 'mixed' también voltearía '2024/05/03'; esos van aparte
+            anio_primero = texto.str.match(r'^\d{4}\D').fillna(False)
+            for dayfirst in (True, False):
+                grupo = pendientes & (anio_primero != dayfirst)
+                if not grupo.any():
+                    continue
+                convertidas = pd.to_datetime(texto[grupo], format='mixed', dayfirst=dayfirst, errors='coerce')
+                convertidas = convertidas[convertidas.notna()]
+                fechas.loc[convertidas.index] = convertidas
+                pendientes.loc[convertidas.index] = False
+
+        return fechas.dt.floor('D'), pendientes
+
+    @staticmethod
     def corrige_fechas(df, columna_fecha):
         """
         Convierte fechas en formato 'dd/mm/yyyy' (como texto) a 'yyyy-mm-dd' en la columna especificada.
         Si la fecha ya está en otro formato válido, la trunca al día.
-        Imprime cuántos renglones fueron cambiados.
+        Imprime cuántos renglones fueron cambiados y cuántos no pudieron convertirse.
         """
-        import pandas as pd
-
         if columna_fecha not in df.columns:
             print(f"⚠️ La columna '{columna_fecha}' no existe en el DataFrame.")
             return df
 
-        cambios = 0
-        df[columna_fecha] = df[columna_fecha].astype(str)
-
-        for idx, valor in df[columna_fecha].items():
-            nuevo_valor = valor
-            if '/' in valor:
-                try:
-                    nuevo_valor = pd.to_datetime(valor, format='%d/%m/%Y', errors='raise')
-                    # Truncar la hora a 00:00:00
-                    nuevo_valor = nuevo_valor.replace(hour=0, minute=0, second=0, microsecond=0)
-                except Exception:
-                    nuevo_valor = valor
-            else:
-                try:
-                    nuevo_valor = pd.to_datetime(valor, errors='raise')
-                    nuevo_valor = nuevo_valor.replace(hour=0, minute=0, second=0, microsecond=0)
-                except Exception:
-                    nuevo_valor = valor
-
-            if not pd.isnull(nuevo_valor) and str(nuevo_valor) != valor:
-                df.at[idx, columna_fecha] = nuevo_valor
-                cambios += 1
-
-        # Convertir toda la columna a datetime (por si acaso)
-        df[columna_fecha] = pd.to_datetime(df[columna_fecha], errors='coerce').dt.floor('D')
+        original = df[columna_fecha].astype('string')
+        fechas, no_parseadas = Helper.parse_date_series(df[columna_fecha])
+        cambios = int((fechas.notna() & (original != fechas.dt.strftime('%Y-%m-%d'))).sum())
+        df[columna_fecha] = fechas
 
         print(f"✅ Se cambiaron {cambios} renglones en la columna '{columna_fecha}'.")
+        if no_parseadas.any():
+            print(f"⚠️ {int(no_parseadas.sum())} renglones sin fecha válida en '{columna_fecha}': "
+                  f"{df.index[no_parseadas].tolist()[:10]}")
         return df
 
     @staticmethod
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import pandas as pd
+from sqlalchemy import text
+
+
+class IngestLedger:
+    """
+    Bitácora de archivos cerrados ya cargados, identificados por el hash de su contenido.
+    Un archivo con el mismo contenido no se vuelve a parsear ni a subir; si el banco
+    reemite un estado con cambios, el hash cambia y el archivo se procesa de nuevo.
+    """
+
+    def __init__(self, schema='banorte_load'):
+        self.schema = schema
+        self.loaded_hashes = set()
+        # Archivos procesados en esta corrida, pendientes de registrar por tabla destino
+        self.pending = {}
+
+    @staticmethod
+    def file_hash(path, block_size=1 << 20):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def ensure_table(self, conn):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.schema}.ingest_ledger (
+                file_hash TEXT PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                cuenta TEXT,
+                target TEXT,
+                row_count INTEGER,
+                loaded_at TIMESTAMP DEFAULT NOW()
+            )
+        """))
+
+    def load(self, conn):
+        """Lee los hashes ya registrados; regresa cuántos hay."""
+        self.ensure_table(conn)
+        df_ledger = pd.read_sql(f"SELECT file_hash FROM {self.schema}.ingest_ledger", conn)
+        self.loaded_hashes = set(df_ledger['file_hash'])
+        self.pending = {}
+        return len(self.loaded_hashes)
+
+    def is_loaded(self, file_hash):
+        return file_hash in self.loaded_hashes
+
+    def add_pending(self, target, file_hash, file_name, cuenta, row_count):
+        self.pending.setdefault(target, []).append({
+            'file_hash': file_hash,
+            'file_name': file_name,
+            'cuenta': cuenta,
+            'target': target,
+            'row_count': int(row_count),
+        })
+
+    def record(self, conn, target):
+        """Registra los archivos de `target` cargados en esta corrida (misma transacción del upsert)."""
+        entries = self.pending.pop(target, [])
+        if not entries:
+            return 0
+        conn.execute(text(f"""
+            INSERT INTO {self.schema}.ingest_ledger (file_hash, file_name, cuenta, target, row_count, loaded_at)
+            VALUES (:file_hash, :file_name, :cuenta, :target, :row_count, NOW())
+            ON CONFLICT (file_hash) DO UPDATE SET
+                file_name = EXCLUDED.file_name,
+                cuenta = EXCLUDED.cuenta,
+                target = EXCLUDED.target,
+                row_count = EXCLUDED.row_count,
+                loaded_at = NOW()
+        """), entries)
+        self.loaded_hashes.update(e['file_hash'] for e in entries)
+        print(f"🧾 Ledger: {len(entries)} archivos registrados para {target}: "
+              f"{[os.path.basename(e['file_name']) for e in entries]}")
+        return len(entries)
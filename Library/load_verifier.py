@@ -0,0 +1,93 @@
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    from Library.money import Money
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from money import Money
+
+
+class LoadVerifier:
+    """
+    Verificación posterior a la carga sin bajar las tablas: por (cuenta, period) se
+    comparan el número de renglones y sumas que no dependen del orden — tx_key módulo
+    2^64 (cubre fecha, unique_concept, cargo y abono) y los montos en centavos.
+    Del lado del DataFrame se calculan al subirlo (son sumas, así que los bloques del
+    streaming se acumulan); del lado de la base, con un solo GROUP BY sobre los tx_key
+    de esta carga: en los cerrados la misma partición puede traer renglones de cargas
+    anteriores, que no entran en la comparación.
+    """
+    PARTITION = ['cuenta', 'period']
+    AMOUNTS = ['cargo', 'abono', 'saldo']
+    CHECKS = ['filas', 'suma_tx_key'] + [f'suma_{col}' for col in AMOUNTS]
+    MODULUS = 2 ** 64
+
+    @classmethod
+    def frame_checksums(cls, df):
+        """Sumas por partición de un DataFrame ya sanitizado y con tx_key."""
+        base = pd.DataFrame({
+            col: df[col].astype(object).where(df[col].notna(), '').astype(str) for col in cls.PARTITION
+        })
+        base['filas'] = 1
+        # uint64 suma con desborde, que es justo la suma módulo 2^64
+        base['suma_tx_key'] = df['tx_key'].astype('int64').to_numpy().view('uint64')
+        for col in cls.AMOUNTS:
+            cents = Money.to_cents(df[col]) if col in df.columns else pd.Series(0, index=df.index)
+            base[f'suma_{col}'] = cents.fillna(0).astype('int64')
+        return base.groupby(cls.PARTITION, sort=False).sum().reset_index()
+
+    @classmethod
+    def combine(cls, previo, nuevo):
+        """Acumula las sumas de otro bloque de la misma tabla."""
+        if previo is None:
+            return nuevo
+        return pd.concat([previo, nuevo], ignore_index=True).groupby(cls.PARTITION, sort=False).sum().reset_index()
+
+    def table_checksums(self, conn, schema, table_name, keys):
+        """Las mismas sumas calculadas en la base, sólo para los renglones con tx_key en `keys`."""
+        sumas = ",\n".join(
+            f"COALESCE(SUM(ROUND({col} * 100)), 0)::bigint AS suma_{col}" for col in self.AMOUNTS
+        )
+        query = text(f"""
+            SELECT cuenta, COALESCE(period, '') AS period, COUNT(*) AS filas,
+                   -- como texto: read_sql pasaría el NUMERIC a float y perdería dígitos
+                   MOD(MOD(SUM(tx_key::numeric), {self.MODULUS}) + {self.MODULUS}, {self.MODULUS})::text AS suma_tx_key,
+                   {sumas}
+            FROM {schema}.{table_name}
+            WHERE tx_key = ANY(CAST(:keys AS BIGINT[]))
+            GROUP BY cuenta, COALESCE(period, '')
+        """)
+        return pd.read_sql(query, conn, params={'keys': [int(k) for k in pd.unique(keys)]})
+
+    def verify(self, conn, schema, table_name, esperado, keys, target=None):
+        """
+        Compara las sumas del DataFrame (`esperado`) con las de los renglones `keys`
+        (tx_key de lo enviado) en la tabla o en `target`, p.ej. la sombra antes de
+        publicarla. Regresa las particiones que no cuadran.
+        """
+        target = target or table_name
+        if esperado is None or esperado.empty:
+            return pd.DataFrame(columns=self.PARTITION)
+        esperado = esperado.copy()
+        esperado['suma_tx_key'] = [int(v) % self.MODULUS for v in esperado['suma_tx_key']]
+        en_base = self.table_checksums(conn, schema, target, keys)
+        en_base['suma_tx_key'] = [int(v) for v in en_base['suma_tx_key']]
+
+        comparado = esperado.merge(en_base, on=self.PARTITION, how='left', suffixes=('', '_base'))
+        fallas = {}
+        for col in self.CHECKS:
+            base = comparado[f'{col}_base']
+            fallas[col] = base.isna().to_numpy() | (comparado[col].astype(object) != base.astype(object)).to_numpy()
+        comparado['no_cuadra'] = [
+            ", ".join(col for col in self.CHECKS if fallas[col][i]) for i in range(len(comparado))
+        ]
+        diferencias = comparado[comparado['no_cuadra'] != '']
+
+        filas = int(esperado['filas'].sum())
+        if diferencias.empty:
+            print(f"🔎 Verificación {schema}.{table_name}: {len(esperado)} particiones, {filas} filas, sumas OK.")
+        else:
+            print(f"❌ Verificación {schema}.{table_name}: {len(diferencias)} de {len(esperado)} particiones no cuadran:")
+            print(diferencias[self.PARTITION + ['filas', 'filas_base', 'no_cuadra']].to_string(index=False))
+        return diferencias
@@ -0,0 +1,92 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+class Money:
+    """
+    Montos como enteros de centavos (Int64 nullable) desde la lectura hasta el envío a SQL.
+    Comparar, deduplicar y hashear enteros es exacto y más barato que hacerlo con float o
+    Decimal, y evita que 0.1 + 0.2 rompa la llave primaria. Sólo en la frontera con la base
+    (NUMERIC(12,2)) o con Excel/Sheets se convierten de vuelta a pesos.
+    """
+    # Columnas de monto, antes y después de mapping_*_banorte
+    MONEY_COLUMNS = {
+        'cargo', 'abono', 'saldo', 'cargos', 'abonos', 'saldos',
+        'importe_inicial', 'importe_pendiente', 'mensualidad',
+    }
+    _AMOUNT = re.compile(r'^(?P<entero>\d*)(?:\.(?P<decimal>\d*))?$')
+    _NOISE = re.compile(r'[\s$,]|MXN|MN', flags=re.IGNORECASE)
+
+    @staticmethod
+    def is_money_column(column):
+        return str(column).strip().lower() in Money.MONEY_COLUMNS
+
+    @staticmethod
+    def to_cents(serie):
+        """
+        Convierte una Serie de montos a centavos Int64 en una pasada vectorizada.
+        Acepta números o texto con separador de miles, signo de pesos, paréntesis o signo
+        negativo; los vacíos y lo que no es monto quedan como <NA>.
+        """
+        if isinstance(serie.dtype, pd.Int64Dtype):
+            return serie
+        if pd.api.types.is_integer_dtype(serie):
+            return (serie.astype('Int64') * 100)
+        if pd.api.types.is_float_dtype(serie):
+            return pd.Series(np.round(serie.to_numpy(dtype='float64') * 100), index=serie.index).astype('Int64')
+
+        texto = serie.astype('string').str.strip()
+        negativo = (
+            texto.str.startswith('-') | texto.str.endswith('-')
+            | (texto.str.startswith('(') & texto.str.endswith(')'))
+        ).fillna(False)
+        limpio = texto.str.replace(Money._NOISE, '', regex=True).str.strip('()-+')
+        partes = limpio.str.extract(Money._AMOUNT)
+        valido = partes['entero'].notna() & ((partes['entero'] != '') | partes['decimal'].fillna('').ne(''))
+
+        entero = partes['entero'].where(partes['entero'] != '', '0').fillna('0').astype('int64')
+        decimal = partes['decimal'].fillna('')
+        centavos = decimal.str[:2].str.pad(2, side='right', fillchar='0').astype('int64')
+        # Redondeo half-up si el archivo trae más de dos decimales
+        acarreo = (decimal.str[2:3].fillna('') >= '5').astype('int64')
+
+        cents = entero * 100 + centavos + acarreo
+        cents = cents.where(~negativo, -cents)
+        return cents.astype('Int64').where(valido, pd.NA)
+
+    @staticmethod
+    def to_text(serie):
+        """Centavos → texto 'pesos.cc' (o None) listo para NUMERIC(12,2)."""
+        cents = serie.astype('Int64')
+        nulos = cents.isna()
+        valores = cents.fillna(0).astype('int64')
+        absoluto = valores.abs()
+        signo = np.where(valores < 0, '-', '')
+        texto = (
+            pd.Series(signo, index=serie.index)
+            + (absoluto // 100).astype(str)
+            + '.'
+            + (absoluto % 100).astype(str).str.zfill(2)
+        )
+        return texto.astype(object).where(~nulos, None)
+
+    @staticmethod
+    def to_float(serie):
+        """Centavos → pesos float64 para Excel / Google Sheets."""
+        return serie.astype('Float64').div(100).astype('float64')
+
+    @staticmethod
+    def frame_to_float(df):
+        """Copia del DataFrame con las columnas de monto en pesos, sólo para mostrar."""
+        # Por posición: el DataFrame puede traer columnas con nombre repetido
+        posiciones = [
+            i for i, (col, dtype) in enumerate(df.dtypes.items())
+            if Money.is_money_column(col) and isinstance(dtype, pd.Int64Dtype)
+        ]
+        if not posiciones:
+            return df
+        columnas = {i: Money.to_float(df.iloc[:, i]) for i in posiciones}
+        return pd.concat(
+            [columnas.get(i, df.iloc[:, i]) for i in range(df.shape[1])], axis=1, keys=range(df.shape[1])
+        ).set_axis(df.columns, axis=1)
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+
+class MsiSchedule:
+    """
+    Planes de meses sin intereses (archivos con BANORTE_month_free_headers) y su
+    calendario de mensualidades pendientes.
+    Cada plan trae Pagos pendientes = n; se expande en n renglones con np.repeat. Las
+    mensualidades van en cortes consecutivos del calendario de la cuenta: la primera del
+    plan en el primer corte >= Fecha de operación, así que la k-ésima pendiente cae
+    (pagos ya hechos + k) cortes después; los pagos hechos salen de Importe inicial entre
+    Mensualidad. La última mensualidad absorbe la diferencia contra Importe pendiente,
+    todo en centavos.
+    """
+    PLAN_KEYS = ['cuenta', 'fecha_operacion', 'unique_concept', 'importe_inicial']
+    INSTALLMENT_KEYS = PLAN_KEYS + ['fecha_corte']
+
+    def __init__(self, schema='banorte_load'):
+        self.schema = schema
+
+    def ensure_tables(self, conn):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.schema}.msi_planes (
+                cuenta TEXT NOT NULL,
+                fecha_operacion DATE NOT NULL,
+                unique_concept TEXT NOT NULL,
+                importe_inicial NUMERIC(12,2) NOT NULL,
+                concepto TEXT,
+                tasa_anual NUMERIC(8,4),
+                importe_pendiente NUMERIC(12,2),
+                pagos_pendientes INTEGER,
+                mensualidad NUMERIC(12,2),
+                file_name TEXT,
+                file_date DATE,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (cuenta, fecha_operacion, unique_concept, importe_inicial)
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.schema}.msi_mensualidades (
+                cuenta TEXT NOT NULL,
+                fecha_operacion DATE NOT NULL,
+                unique_concept TEXT NOT NULL,
+                importe_inicial NUMERIC(12,2) NOT NULL,
+                fecha_corte DATE NOT NULL,
+                period TEXT NOT NULL,
+                pago_restante INTEGER NOT NULL,
+                mensualidad NUMERIC(12,2) NOT NULL,
+                concepto TEXT,
+                file_date DATE,
+                PRIMARY KEY (cuenta, fecha_operacion, unique_concept, importe_inicial, fecha_corte),
+                FOREIGN KEY (cuenta, fecha_operacion, unique_concept, importe_inicial)
+                    REFERENCES {self.schema}.msi_planes (cuenta, fecha_operacion, unique_concept, importe_inicial)
+                    ON DELETE CASCADE
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS msi_mensualidades_corte_idx
+                ON {self.schema}.msi_mensualidades (fecha_corte, cuenta) INCLUDE (mensualidad)
+        """))
+
+    @staticmethod
+    def prepare_plans(df_planes):
+        """
+        Tipos de los planes ya normalizados: tasa como número, sin planes liquidados y con
+        mensualidad siempre presente (msi_mensualidades.mensualidad es NOT NULL).
+        """
+        if 'tasa_anual' in df_planes.columns:
+            tasa = df_planes['tasa_anual'].astype('string').str.replace('%', '', regex=False).str.strip()
+            df_planes['tasa_anual'] = pd.to_numeric(tasa, errors='coerce')
+        df_planes['pagos_pendientes'] = pd.to_numeric(df_planes['pagos_pendientes'], errors='coerce').astype('Int64')
+        df_planes = df_planes[df_planes['pagos_pendientes'].fillna(0) > 0].reset_index(drop=True)
+
+        # Mensualidad en blanco: se deriva del importe pendiente entre los pagos que faltan
+        derivada = (df_planes['importe_pendiente'].astype('Float64') / df_planes['pagos_pendientes'].astype('Float64')).round()
+        df_planes['mensualidad'] = df_planes['mensualidad'].astype('Int64').fillna(derivada.astype('Int64'))
+        sin_monto = df_planes['mensualidad'].isna()
+        if sin_monto.any():
+            print(f"⚠️ MSI: {int(sin_monto.sum())} planes sin mensualidad ni importe pendiente, se omiten: "
+                  f"{df_planes.loc[sin_monto, 'concepto'].tolist()}")
+        return df_planes[~sin_monto].reset_index(drop=True)
+
+    @classmethod
+    def expand(cls, df_planes, calendar):
+        """Una fila por mensualidad pendiente de cada plan, con su fecha de corte y period."""
+        columnas = cls.INSTALLMENT_KEYS + ['period', 'pago_restante', 'mensualidad', 'concepto', 'file_date']
+        if df_planes.empty:
+            return pd.DataFrame(columns=columnas)
+
+        pagos = df_planes['pagos_pendientes'].fillna(0).astype('int64').to_numpy()
+        # Sin fecha de operación se ancla en la del archivo
+        desde = pd.to_datetime(df_planes['fecha_operacion'].astype(object)).fillna(
+            pd.to_datetime(df_planes['file_date'].astype(object)))
+        # Mensualidades ya pagadas: plazo total (importe inicial / mensualidad) menos las pendientes
+        plazo = (df_planes['importe_inicial'].astype('Float64') / df_planes['mensualidad'].astype('Float64')).round()
+        pagados = np.maximum(plazo.fillna(0).to_numpy(dtype='float64').astype('int64') - pagos, 0)
+
+        # Posición de cada mensualidad dentro de su plan: 0..n-1
+        plan = np.repeat(np.arange(len(df_planes)), pagos)
+        inicio = np.repeat(np.cumsum(pagos) - pagos, pagos)
+        k = np.arange(len(plan)) - inicio
+
+        # Cortes del calendario de cada cuenta (una búsqueda binaria por cuenta, no por plan)
+        fecha_corte = np.empty(len(plan), dtype='datetime64[D]')
+        period = np.empty(len(plan), dtype=object)
+        cuentas = df_planes['cuenta'].astype(str).to_numpy()
+        for cuenta in pd.unique(cuentas):
+            mismos = np.flatnonzero(cuentas == cuenta)
+            calendario = calendar.for_account(cuenta)
+            meses = int((pagados[mismos] + pagos[mismos]).max()) + 1
+            calendario.cover(desde.iloc[mismos].min(), desde.iloc[mismos].max() + pd.DateOffset(months=meses))
+            # Corte de la primera mensualidad pendiente de cada plan de la cuenta
+            primer_corte = calendario.next_cutoff_index(desde.iloc[mismos]) + pagados[mismos]
+            filas = np.isin(plan, mismos)
+            posicion = np.searchsorted(mismos, plan[filas])
+            fecha_corte[filas], period[filas] = calendario.cutoffs_at(primer_corte[posicion] + k[filas])
+
+        mensualidad = df_planes['mensualidad'].astype('Int64').to_numpy(dtype='float64', na_value=np.nan)[plan]
+        pendiente = df_planes['importe_pendiente'].astype('Int64').to_numpy(dtype='float64', na_value=np.nan)[plan]
+        n = pagos[plan]
+        # La última mensualidad cierra el importe pendiente (si el dato es consistente)
+        resto = pendiente - mensualidad * (n - 1)
+        ultima = (k == n - 1) & ~np.isnan(resto) & (resto > 0)
+        monto = np.where(ultima, resto, mensualidad)
+
+        base = df_planes.iloc[plan].reset_index(drop=True)
+        return pd.DataFrame({
+            'cuenta': base['cuenta'].astype(object),
+            'fecha_operacion': base['fecha_operacion'],
+            'unique_concept': base['unique_concept'],
+            'importe_inicial': base['importe_inicial'],
+            'fecha_corte': pd.to_datetime(fecha_corte),
+            'period': period,
+            'pago_restante': (k + 1).astype('int64'),
+            'mensualidad': pd.array(np.round(monto), dtype='Float64').astype('Int64'),
+            'concepto': base['concepto'],
+            'file_date': base['file_date'].astype(object),
+        }, columns=columnas)
+
+    def clear_pending(self, conn, cuentas):
+        """Borra los planes (y sus mensualidades) de las cuentas que traen un archivo nuevo."""
+        cuentas = sorted({str(c) for c in cuentas})
+        if not cuentas:
+            return 0
+        result = conn.execute(
+            text(f"DELETE FROM {self.schema}.msi_planes WHERE cuenta = ANY(:cuentas)"),
+            {'cuentas': cuentas},
+        )
+        return result.rowcount
+
+    def projection(self, conn, months=6):
+        """Mensualidades a pagar en los próximos `months` cortes, por period y cuenta."""
+        query = text(f"""
+            SELECT period, cuenta, COUNT(*) AS planes, SUM(mensualidad) AS total
+            FROM {self.schema}.msi_mensualidades
+            WHERE fecha_corte >= CURRENT_DATE
+              AND fecha_corte < CURRENT_DATE + make_interval(months => :months)
+            GROUP BY period, cuenta
+            ORDER BY period, cuenta
+        """)
+        return pd.read_sql(query, conn, params={'months': int(months)})
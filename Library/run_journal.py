@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import pandas as pd
+
+try:
+    from Library.frame_memory import FrameMemory
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from frame_memory import FrameMemory
+
+
+class RunJournal:
+    """
+    Bitácora persistente de una corrida de csv_to_sql_process, etapa por etapa (discover,
+    parse, export, normalize, load/verify por tabla). Cada etapa terminada se escribe al
+    momento en journal.json junto con sus datos; con --resume los DataFrames normalizados
+    también se guardan en parquet. Con --resume, si los archivos de entrada no cambiaron, la corrida siguiente
+    retoma en la primera etapa incompleta en vez de repetir todo.
+    """
+    FILE = 'journal.json'
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, self.FILE)
+        self.state = {'run_key': None, 'status': None, 'stages': {}}
+
+    @staticmethod
+    def run_key(files):
+        """Firma de los archivos de entrada (nombre, tamaño y fecha de modificación)."""
+        digest = hashlib.sha256()
+        for file in sorted(files):
+            stat = os.stat(file)
+            digest.update(f"{os.path.basename(file)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer la bitácora {self.path}, se empieza de cero: {e}")
+            return None
+
+    def _write(self):
+        os.makedirs(self.folder, exist_ok=True)
+        # Escritura atómica: una caída a media escritura no deja el JSON corrupto
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def start(self, run_key, resume=False):
+        """Abre la corrida; con resume retoma la anterior si quedó incompleta con las mismas entradas."""
+        previo = self._read()
+        if resume and previo and previo.get('status') == 'en curso':
+            if previo.get('run_key') == run_key:
+                self.state = previo
+                print(f"↩️ Reanudando la corrida del {previo.get('started_at')}; etapas completas: {list(previo['stages'])}")
+                return True
+            print("ℹ️ Los archivos de entrada cambiaron desde la corrida interrumpida; se empieza de cero.")
+        elif resume:
+            print("ℹ️ No hay corrida incompleta que reanudar; se empieza de cero.")
+
+        self._clear_frames(previo)
+        self.state = {
+            'run_key': run_key,
+            'status': 'en curso',
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'stages': {},
+        }
+        self._write()
+        return False
+
+    def is_done(self, stage):
+        return stage in self.state['stages']
+
+    def get(self, stage):
+        return self.state['stages'].get(stage)
+
+    def mark_done(self, stage, **info):
+        self.state['stages'][stage] = {'finished_at': datetime.now().isoformat(timespec='seconds'), **info}
+        self._write()
+
+    def save_frames(self, stage, frames):
+        """Guarda en parquet los DataFrames de una etapa; regresa {nombre: archivo}."""
+        os.makedirs(self.folder, exist_ok=True)
+        archivos = {}
+        for name, df in frames.items():
+            if df is None:
+                continue
+            archivo = os.path.join(self.folder, f"{stage}_{name}.parquet")
+            df.to_parquet(archivo, index=False)
+            archivos[name] = archivo
+        return archivos
+
+    def load_frames(self, stage, names):
+        """
+        DataFrames guardados por save_frames (None para los que la etapa no guardó).
+        Parquet no conserva como categóricas todas las columnas compactas (file_date
+        regresa como object), así que se vuelven a compactar con FrameMemory.
+        """
+        archivos = (self.get(stage) or {}).get('frames', {})
+        return {name: FrameMemory.compact(pd.read_parquet(archivos[name])) if name in archivos else None
+                for name in names}
+
+    def finish(self):
+        self._clear_frames(self.state)
+        self.state['status'] = 'completo'
+        self.state['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self._write()
+
+    @staticmethod
+    def _clear_frames(state):
+        for record in (state or {}).get('stages', {}).values():
+            for archivo in record.get('frames', {}).values():
+                if os.path.exists(archivo):
+                    os.remove(archivo)
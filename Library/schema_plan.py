@@ -0,0 +1,107 @@
+import os
+import pandas as pd
+import yaml
+
+try:
+    from Library.file_classifier import FileClassifier
+    from Library.bank_parsers import ParserRegistry
+    from Library.money import Money
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from file_classifier import FileClassifier
+    from bank_parsers import ParserRegistry
+    from money import Money
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+STRING_DTYPE = 'string[pyarrow]' if ARROW_AVAILABLE else 'string'
+
+
+class SchemaPlan:
+    """
+    Tipos explícitos por columna para los CSV del banco, uno por parser del
+    ParserRegistry: los encabezados salen de la firma del parser y el tipo de cada
+    columna del nombre canónico que le da su mapping. Así la lectura no depende de la
+    inferencia de pandas (que deja todo en object) y, con pyarrow instalado, usa el
+    lector multihilo de Arrow con las cadenas guardadas en memoria columnar.
+    """
+    # Tipo por nombre normalizado; lo que no aparece aquí se lee como texto.
+    # 'cents' = monto en centavos Int64 (ver Money)
+    COLUMN_TYPES = {
+        'cargo': 'cents',
+        'abono': 'cents',
+        'saldo': 'cents',
+        'importe_inicial': 'cents',
+        'importe_pendiente': 'cents',
+        'mensualidad': 'cents',
+    }
+    _default = None
+
+    def __init__(self, registry):
+        self.plans = {}
+        self.signatures = dict(registry.signatures)
+        for name, parser in registry.parsers.items():
+            self.plans[name] = {
+                col: self.COLUMN_TYPES.get(parser.mapping.get(col), STRING_DTYPE) for col in parser.headers
+            }
+
+    @classmethod
+    def default(cls):
+        """Plan construido con el config.yaml de MAIN_PATH (o el del repositorio)."""
+        if cls._default is None:
+            root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+            yaml_path = os.path.join(os.getenv('MAIN_PATH', root), 'config.yaml')
+            if not os.path.exists(yaml_path):
+                yaml_path = os.path.join(root, 'config.yaml')
+            with open(yaml_path, 'r') as file:
+                cls._default = cls(ParserRegistry(yaml.safe_load(file)))
+        return cls._default
+
+    def parser_for(self, path):
+        try:
+            return self.signatures.get(tuple(FileClassifier.read_header(path)))
+        except Exception:
+            return None
+
+    def dtypes_for(self, parser):
+        return dict(self.plans.get(parser, {}))
+
+    def read_csv(self, path, parser=None, chunksize=None):
+        """
+        Lee un CSV con el plan de su parser (se detecta por encabezado si no se indica).
+        Con chunksize regresa un iterador de bloques ya tipados.
+        """
+        parser = parser or self.parser_for(path)
+        dtypes = self.dtypes_for(parser)
+        if not dtypes:
+            return pd.read_csv(path, chunksize=chunksize)
+
+        if chunksize is None and ARROW_AVAILABLE:
+            # Camino rápido: Arrow lee los montos como número y se pasan a centavos
+            arrow_dtypes = {col: 'float64' if dtype == 'cents' else dtype for col, dtype in dtypes.items()}
+            try:
+                return self.coerce(pd.read_csv(path, engine='pyarrow', dtype=arrow_dtypes), parser)
+            except Exception:
+                # Montos con formato ($, comas); se leen como texto y se convierten
+                pass
+
+        text_dtypes = {col: STRING_DTYPE for col in dtypes}
+        if chunksize is not None:
+            reader = pd.read_csv(path, dtype=text_dtypes, chunksize=chunksize)
+            return (self.coerce(chunk, parser) for chunk in reader)
+        if ARROW_AVAILABLE:
+            df = pd.read_csv(path, engine='pyarrow', dtype=text_dtypes)
+        else:
+            df = pd.read_csv(path, dtype=text_dtypes)
+        return self.coerce(df, parser)
+
+    def coerce(self, df, parser):
+        """Convierte los montos del plan (texto o float) a centavos Int64."""
+        for col, dtype in self.plans.get(parser, {}).items():
+            if dtype == 'cents' and col in df.columns:
+                df[col] = Money.to_cents(df[col])
+        return df
@@ -90,6 +90,8 @@ class SheetsUpdater:
     
     def _process_dataframe_for_sheets(self, df):
         """Procesa el DataFrame para compatibilidad con Google Sheets"""
+        # Las categóricas del ingest no aceptan "" en fillna; se expanden aquí
+        df = df.astype({col: object for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)})
         # Limpiar valores infinitos y NaN
         df = df.replace([np.inf, -np.inf], np.nan)
         df = df.fillna("")
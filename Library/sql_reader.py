@@ -0,0 +1,136 @@
+import io
+import json
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+class SqlReader:
+    """
+    Lectura de consultas a DataFrame que elige sola el camino. En PostgreSQL (psycopg2)
+    se pide al planner la estimación de renglones (un EXPLAIN, sin ejecutar la consulta):
+    debajo de min_rows se lee con pd.read_sql tal cual; a partir de ahí el resultado sale
+    con COPY (consulta) TO STDOUT en CSV, que pyarrow convierte en columnas según los
+    tipos que reporta la consulta, sin pasar renglón por renglón por objetos Python.
+    Sin pyarrow, con parámetros o con otra conexión se usa pd.read_sql; si el COPY falla
+    también.
+    """
+    # OID de PostgreSQL -> nombre del tipo Arrow; lo que no está aquí se lee como texto
+    ARROW_TYPES = {
+        16: 'bool_',        # bool
+        20: 'int64',        # int8
+        21: 'int64',        # int2
+        23: 'int64',        # int4
+        700: 'float64',     # float4
+        701: 'float64',     # float8
+        1700: 'float64',    # numeric (pd.read_sql también lo pasa a float)
+        1082: 'date32',     # date
+        1114: 'timestamp',  # timestamp
+    }
+    TIMESTAMPTZ = 1184
+
+    def __init__(self, min_rows=10000):
+        # Debajo de min_rows estimados el COPY no compensa las consultas extra
+        self.min_rows = min_rows
+
+    @staticmethod
+    def raw_connection(conn):
+        """Conexión psycopg2 detrás de una Connection de SQLAlchemy (o la misma si ya lo es)."""
+        if hasattr(conn, 'dialect'):
+            return conn.connection if conn.dialect.driver == 'psycopg2' else None
+        return conn if hasattr(conn, 'get_dsn_parameters') else None
+
+    def read(self, conn, query, params=None):
+        """DataFrame de `query`; COPY para resultados grandes y pd.read_sql para el resto."""
+        raw = None
+        if ARROW_AVAILABLE and params is None and isinstance(query, str):
+            raw = self.raw_connection(conn)
+        if raw is None:
+            return pd.read_sql(query, conn, params=params)
+
+        query = query.strip().rstrip(';')
+        cur = raw.cursor()
+        try:
+            # Un error aquí es el mismo que daría pd.read_sql con esta consulta
+            chica = self.estimated_rows(cur, query) < self.min_rows
+        finally:
+            cur.close()
+        if chica:
+            return pd.read_sql(query, conn)
+
+        # El savepoint (sólo en lecturas grandes) deja la transacción usable si la
+        # consulta no se puede copiar; en autocommit no hay transacción que cuidar
+        savepoint = not raw.autocommit
+        cur = raw.cursor()
+        try:
+            if savepoint:
+                cur.execute("SAVEPOINT sql_reader")
+            try:
+                # None cuando el resultado viene vacío
+                df = self.copy_to_frame(cur, query)
+            except Exception as e:
+                print(f"⚠️ COPY no disponible para la consulta, se usa pd.read_sql: {e}")
+                df = None
+                if savepoint:
+                    cur.execute("ROLLBACK TO SAVEPOINT sql_reader")
+            if savepoint:
+                cur.execute("RELEASE SAVEPOINT sql_reader")
+        finally:
+            cur.close()
+        return pd.read_sql(query, conn) if df is None else df
+
+    def estimated_rows(self, cur, query):
+        cur.execute(f"EXPLAIN (FORMAT JSON) {query}")
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
+    def arrow_type(self, oid):
+        nombre = self.ARROW_TYPES.get(oid)
+        if nombre is None:
+            return pa.string()
+        return pa.timestamp('us') if nombre == 'timestamp' else getattr(pa, nombre)()
+
+    def copy_to_frame(self, cur, query):
+        # Nombres y tipos del resultado sin traer renglones
+        cur.execute(f"SELECT * FROM ({query}) q LIMIT 0")
+        columnas = [(col.name, col.type_code) for col in cur.description]
+
+        buffer = io.BytesIO()
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buffer)
+        if buffer.tell() == 0:
+            # Sin renglones Arrow no tiene qué leer; pd.read_sql arma el DataFrame vacío
+            return None
+        buffer.seek(0)
+
+        # Columnas repetidas (p.ej. d.*, c.*) llevan posición para que Arrow las distinga
+        nombres = [f"{i}_{name}" for i, (name, _) in enumerate(columnas)]
+        tabla = pa_csv.read_csv(
+            buffer,
+            read_options=pa_csv.ReadOptions(column_names=nombres),
+            # COPY escribe NULL como vacío sin comillas y el texto vacío como ""
+            convert_options=pa_csv.ConvertOptions(
+                column_types={n: self.arrow_type(oid) for n, (_, oid) in zip(nombres, columnas)},
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+                true_values=['t'],
+                false_values=['f'],
+            ),
+        )
+        # Conversión por omisión de Arrow: enteros con nulos a float, fechas como date;
+        # los mismos tipos que entrega pd.read_sql
+        df = tabla.to_pandas()
+        df.columns = [name for name, _ in columnas]
+        for i, (_, oid) in enumerate(columnas):
+            if tabla.column(i).null_count == tabla.num_rows:
+                # pd.read_sql deja las columnas sin ningún valor como object con None
+                df.isetitem(i, pd.Series([None] * len(df), dtype=object))
+            elif oid == self.TIMESTAMPTZ:
+                df.isetitem(i, pd.to_datetime(df.iloc[:, i], utc=True, format='ISO8601'))
+        return df
@@ -0,0 +1,237 @@
+import io
+import re
+from datetime import date
+import numpy as np
+import pandas as pd
+import psycopg2.errors
+
+try:
+    from Library.money import Money
+except ModuleNotFoundError:
+    # fallback if running inside the Library folder
+    from money import Money
+
+
+class StagingLoader:
+    """
+    Carga masiva para upsert_dataframe: los renglones viajan con COPY FROM STDIN a una
+    tabla temporal con la misma estructura que el destino, y de ahí un solo
+    INSERT ... SELECT ... ON CONFLICT los aplica. Postgres planea una sentencia por tabla
+    en lugar de una por página de VALUES, y del lado del cliente no se arma SQL.
+
+    El ON CONFLICT sólo actualiza los renglones que cambiaron (IS DISTINCT FROM) y
+    RETURNING (xmax = 0) distingue insertados de actualizados; el resto son sin cambios.
+    Con delta (prune_unchanged) los renglones sin cambios salen de la staging antes del
+    merge y ni siquiera intentan el INSERT.
+
+    Las tablas que se reemplazan completas (abierto) no se truncan: la foto se carga en
+    una tabla sombra y se publica con un rename dentro de la transacción, así los
+    lectores siguen viendo la versión anterior hasta el commit y nunca una tabla vacía.
+    La sombra conviene crearla en su propia transacción (create_shadow + commit) y
+    borrar la versión anterior después del commit (drop_previous): las llaves foráneas
+    hacia accounts bloquean accounts mientras la transacción siga abierta.
+    """
+    COPY_BATCH_ROWS = 50000
+    NULL = r'\N'
+    NULL_MARKERS = ("", "nat", "nan", "none", "null", "n/a", "<na>")
+    # Las columnas de fecha no aceptan nulos en el destino; se usa una fecha centinela
+    DUMMY_DATE = date(1900, 1, 1)
+    # El rename espera a lo más esto por los lectores en curso antes de reintentar
+    SWAP_LOCK_TIMEOUT = '2s'
+    SWAP_RETRIES = 5
+
+    @staticmethod
+    def staging_name(table_name):
+        return f"stg_{table_name}"
+
+    def create_staging(self, cur, schema, table_name):
+        staging = self.staging_name(table_name)
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging}")
+        # Temporal: no escribe WAL y sólo la ve esta sesión
+        cur.execute(f"CREATE TEMP TABLE {staging} (LIKE {schema}.{table_name} INCLUDING DEFAULTS)")
+        return staging
+
+    @classmethod
+    def sanitize(cls, df):
+        """
+        Deja el DataFrame listo para el COPY con una pasada enmascarada por columna:
+        - texto: strip y los marcadores de nulo ('', 'nan', 'none', ...) pasan a nulo;
+        - categóricas: la limpieza se hace sobre las categorías y se reparte por código;
+        - centavos Int64 de columnas de monto: texto 'pesos.cc' para NUMERIC(12,2);
+        - columnas de fecha ('fecha' o 'date' en el nombre): nulo → DUMMY_DATE.
+        Regresa un DataFrame nuevo con las mismas columnas.
+        """
+        limpias = {}
+        for col in df.columns:
+            serie = df[col]
+            dtype = serie.dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                categorias = cls._clean_text(pd.Series(serie.cat.categories, dtype=object))
+                codes = serie.cat.codes.to_numpy()
+                valores = np.append(categorias.to_numpy(dtype=object), None)
+                serie = pd.Series(valores[codes], index=serie.index, dtype=object)
+            elif isinstance(dtype, pd.Int64Dtype) and Money.is_money_column(col):
+                serie = Money.to_text(serie)
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                serie = cls._clean_text(serie)
+
+            if cls.is_date_column(col):
+                if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+                    serie = serie.fillna(pd.Timestamp(cls.DUMMY_DATE))
+                else:
+                    serie = serie.astype(object).where(serie.notna(), cls.DUMMY_DATE)
+            limpias[col] = serie
+        return pd.DataFrame(limpias, index=df.index, columns=df.columns)
+
+    @classmethod
+    def _clean_text(cls, serie):
+        texto = serie.astype('string').str.strip()
+        nulos = texto.isna() | texto.str.lower().isin(cls.NULL_MARKERS)
+        return texto.astype(object).where(~nulos, None)
+
+    @staticmethod
+    def is_date_column(col):
+        return 'fecha' in col or 'date' in col
+
+    def copy_frame(self, cur, staging, df):
+        """Envía el DataFrame ya sanitizado por COPY en lotes de COPY_BATCH_ROWS renglones."""
+        copy_sql = f"COPY {staging} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '{self.NULL}')"
+        for inicio in range(0, len(df), self.COPY_BATCH_ROWS):
+            buffer = io.StringIO()
+            df.iloc[inicio:inicio + self.COPY_BATCH_ROWS].to_csv(
+                buffer, header=False, index=False, na_rep=self.NULL, lineterminator='\n'
+            )
+            buffer.seek(0)
+            cur.copy_expert(copy_sql, buffer)
+        return len(df)
+
+    def prune_unchanged(self, cur, schema, table_name, staging, cols, primary_keys):
+        """
+        Modo delta: borra de la tabla staging los renglones idénticos a los guardados, para
+        que el merge sólo intente los nuevos o modificados. La comparación es del lado del
+        servidor, por tx_key (indexada) cuando la tabla la tiene o por la llave primaria,
+        y sobre todas las columnas enviadas. Regresa cuántos renglones se quitaron.
+        """
+        if 'tx_key' in cols:
+            join_sql = "t.tx_key = s.tx_key"
+        else:
+            join_sql = " AND ".join(f"t.{pk} = s.{pk}" for pk in primary_keys)
+        cur.execute(f"""
+            DELETE FROM {staging} s
+            USING {schema}.{table_name} t
+            WHERE {join_sql}
+              AND ({", ".join(f"t.{col}" for col in cols)})
+                  IS NOT DISTINCT FROM ({", ".join(f"s.{col}" for col in cols)})
+        """)
+        return cur.rowcount
+
+    def merge(self, cur, schema, table_name, staging, cols, primary_keys):
+        """Aplica la tabla staging al destino; regresa (insertados, actualizados)."""
+        col_list_sql = ", ".join(cols)
+        update_cols = [col for col in cols if col not in primary_keys]
+        if update_cols:
+            conflict_sql = f"""
+                DO UPDATE SET {", ".join(f"{col} = EXCLUDED.{col}" for col in update_cols)}
+                WHERE ({", ".join(f"t.{col}" for col in update_cols)})
+                    IS DISTINCT FROM ({", ".join(f"EXCLUDED.{col}" for col in update_cols)})
+            """
+        else:
+            conflict_sql = "DO NOTHING"
+        cur.execute(f"""
+            WITH aplicados AS (
+                INSERT INTO {schema}.{table_name} AS t ({col_list_sql})
+                SELECT {col_list_sql} FROM {staging}
+                ON CONFLICT ({", ".join(primary_keys)})
+                {conflict_sql}
+                RETURNING (xmax = 0) AS insertado
+            )
+            SELECT COUNT(*) FILTER (WHERE insertado), COUNT(*) FILTER (WHERE NOT insertado)
+            FROM aplicados
+        """)
+        insertados, actualizados = cur.fetchone()
+        return insertados, actualizados
+
+    @staticmethod
+    def shadow_name(table_name):
+        return f"{table_name}_shadow"
+
+    @staticmethod
+    def previous_name(table_name):
+        return f"{table_name}_old"
+
+    def create_shadow(self, cur, schema, table_name):
+        """
+        Tabla sombra con la misma definición que el destino: columnas, defaults, checks e
+        índices (LIKE ... INCLUDING ALL), más las llaves foráneas, triggers y permisos
+        que LIKE no copia. Los triggers de sincronización corren al cargarla, igual que
+        antes con el INSERT sobre la tabla truncada.
+        """
+        shadow = self.shadow_name(table_name)
+        # Restos de una corrida interrumpida
+        cur.execute(f"DROP TABLE IF EXISTS {schema}.{shadow}")
+        cur.execute(f"DROP TABLE IF EXISTS {schema}.{self.previous_name(table_name)}")
+        cur.execute(f"CREATE TABLE {schema}.{shadow} (LIKE {schema}.{table_name} INCLUDING ALL)")
+
+        cur.execute("""
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        """, (f"{schema}.{table_name}",))
+        for nombre, definicion in cur.fetchall():
+            cur.execute(f'ALTER TABLE {schema}.{shadow} ADD CONSTRAINT "{nombre}" {definicion}')
+
+        cur.execute("""
+            SELECT pg_get_triggerdef(oid)
+            FROM pg_trigger
+            WHERE tgrelid = %s::regclass AND NOT tgisinternal
+        """, (f"{schema}.{table_name}",))
+        destino = re.compile(rf" ON (\S+\.)?{re.escape(table_name)} ")
+        for (definicion,) in cur.fetchall():
+            cur.execute(destino.sub(f" ON {schema}.{shadow} ", definicion, count=1))
+
+        cur.execute("""
+            SELECT grantee, string_agg(privilege_type, ', ')
+            FROM information_schema.role_table_grants
+            WHERE table_schema = %s AND table_name = %s AND grantee <> current_user
+            GROUP BY grantee
+        """, (schema, table_name))
+        for grantee, privilegios in cur.fetchall():
+            rol = grantee if grantee == 'PUBLIC' else f'"{grantee}"'
+            cur.execute(f"GRANT {privilegios} ON {schema}.{shadow} TO {rol}")
+        return shadow
+
+    def swap_shadow(self, cur, schema, table_name, shadow):
+        """
+        Publica la sombra: destino → _old y sombra → destino; la anterior se borra después
+        del commit con drop_previous.
+        El rename toma ACCESS EXCLUSIVE sólo desde aquí hasta el commit; si un lector
+        largo lo bloquea más de SWAP_LOCK_TIMEOUT se suelta y se reintenta, para no
+        formar una fila de lectores detrás del rename.
+        """
+        anterior = self.previous_name(table_name)
+        for intento in range(1, self.SWAP_RETRIES + 1):
+            cur.execute("SAVEPOINT swap_shadow")
+            try:
+                cur.execute(f"SET LOCAL lock_timeout = '{self.SWAP_LOCK_TIMEOUT}'")
+                cur.execute(f"ALTER TABLE {schema}.{table_name} RENAME TO {anterior}")
+                cur.execute(f"ALTER TABLE {schema}.{shadow} RENAME TO {table_name}")
+                cur.execute("SET LOCAL lock_timeout = DEFAULT")
+                cur.execute("RELEASE SAVEPOINT swap_shadow")
+                break
+            except psycopg2.errors.LockNotAvailable:
+                cur.execute("ROLLBACK TO SAVEPOINT swap_shadow")
+                print(f"⏳ {schema}.{table_name} ocupada por lectores, reintento {intento}/{self.SWAP_RETRIES}...")
+        else:
+            raise RuntimeError(f"No se pudo publicar {schema}.{shadow}: {schema}.{table_name} siguió bloqueada")
+
+    def drop_previous(self, cur, schema, table_name, shadow):
+        """Borra la versión anterior ya publicada y devuelve a los índices sus nombres originales."""
+        cur.execute(f"DROP TABLE IF EXISTS {schema}.{self.previous_name(table_name)}")
+        # Los índices de la sombra (incluida la PK) recuperan los nombres originales
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s", (schema, table_name))
+        for (indice,) in cur.fetchall():
+            if shadow in indice:
+                cur.execute(f"ALTER INDEX {schema}.{indice} RENAME TO {indice.replace(shadow, table_name)}")
+
+    def drop_staging(self, cur, staging):
+        cur.execute(f"DROP TABLE IF EXISTS pg_temp.{staging}")
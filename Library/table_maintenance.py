@@ -0,0 +1,108 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+class TableMaintenance:
+    """
+    Mantenimiento al final de la carga. El reemplazo diario de los *_abierto y los upserts
+    sobre los cerrados dejan estadísticas viejas y tuplas muertas, y los reportes
+    (Credito.sql, Debito.sql) van tomando peores planes.
+    Con la misma regla que autovacuum (umbral fijo + fracción de los renglones), sólo se
+    hace ANALYZE a las tablas cuyo conteo de renglones modificados la rebasó; de todas se
+    guarda una foto (tuplas vivas/muertas, tamaños) en table_stats_history y se marcan las
+    que necesitan VACUUM. El VACUUM no se corre aquí: no puede ir dentro de una transacción.
+    """
+    HISTORY = 'table_stats_history'
+
+    def __init__(self, schema='banorte_load', analyze_min_rows=500, analyze_scale_factor=0.05, vacuum_dead_ratio=0.2):
+        self.schema = schema
+        self.analyze_min_rows = analyze_min_rows
+        self.analyze_scale_factor = analyze_scale_factor
+        self.vacuum_dead_ratio = vacuum_dead_ratio
+
+    def ensure_table(self, conn):
+        # La llave (table_name, captured_at) sirve de índice para la historia por tabla
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.schema}.{self.HISTORY} (
+                table_name TEXT NOT NULL,
+                captured_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                live_tuples BIGINT,
+                dead_tuples BIGINT,
+                mod_since_analyze BIGINT,
+                dead_ratio NUMERIC(6,4),
+                table_bytes BIGINT,
+                index_bytes BIGINT,
+                total_bytes BIGINT,
+                last_analyze TIMESTAMPTZ,
+                last_vacuum TIMESTAMPTZ,
+                analyzed BOOLEAN NOT NULL DEFAULT FALSE,
+                needs_vacuum BOOLEAN NOT NULL DEFAULT FALSE,
+                PRIMARY KEY (table_name, captured_at)
+            )
+        """))
+
+    def table_stats(self, conn, tables):
+        """Contadores de pg_stat_user_tables y tamaños de `tables`."""
+        # Los contadores se leen una vez por transacción; se descarta la foto previa
+        conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+        query = text("""
+            SELECT s.relname AS table_name,
+                   s.n_live_tup AS live_tuples,
+                   s.n_dead_tup AS dead_tuples,
+                   s.n_mod_since_analyze AS mod_since_analyze,
+                   c.reltuples,
+                   pg_relation_size(s.relid) AS table_bytes,
+                   pg_indexes_size(s.relid) AS index_bytes,
+                   pg_total_relation_size(s.relid) AS total_bytes,
+                   GREATEST(s.last_analyze, s.last_autoanalyze) AS last_analyze,
+                   GREATEST(s.last_vacuum, s.last_autovacuum) AS last_vacuum
+            FROM pg_stat_user_tables s
+            JOIN pg_class c ON c.oid = s.relid
+            WHERE s.schemaname = :schema
+              AND s.relname = ANY(CAST(:tables AS TEXT[]))
+            ORDER BY s.relname
+        """)
+        return pd.read_sql(query, conn, params={'schema': self.schema, 'tables': list(tables)})
+
+    def run(self, conn, tables, modified=None):
+        """
+        ANALYZE de las tablas que cruzaron el umbral y registro de la foto de todas.
+        `modified` ({tabla: renglones escritos en la corrida}) cubre los contadores que las
+        conexiones de la carga todavía no reportan a pg_stat. Regresa el DataFrame
+        registrado (con analyzed y needs_vacuum).
+        """
+        self.ensure_table(conn)
+        df_stats = self.table_stats(conn, tables)
+        if df_stats.empty:
+            print("ℹ️ Mantenimiento: no hay estadísticas de las tablas cargadas.")
+            return df_stats
+
+        escritos = df_stats['table_name'].map(modified or {}).fillna(0).astype('int64')
+        df_stats['mod_since_analyze'] = df_stats['mod_since_analyze'].clip(lower=escritos)
+
+        # reltuples es -1 mientras la tabla no se ha analizado; entonces se usan las vivas
+        base = df_stats['reltuples'].where(df_stats['reltuples'] >= 0, df_stats['live_tuples'])
+        umbral = self.analyze_min_rows + self.analyze_scale_factor * base
+        df_stats['analyzed'] = df_stats['mod_since_analyze'] >= umbral
+        total = df_stats['live_tuples'] + df_stats['dead_tuples']
+        df_stats['dead_ratio'] = (df_stats['dead_tuples'] / total.where(total > 0)).fillna(0).round(4)
+        df_stats['needs_vacuum'] = (df_stats['dead_ratio'] >= self.vacuum_dead_ratio) & (df_stats['dead_tuples'] >= self.analyze_min_rows)
+
+        for table_name in df_stats.loc[df_stats['analyzed'], 'table_name']:
+            conn.execute(text(f"ANALYZE {self.schema}.{table_name}"))
+
+        columnas = ['table_name', 'live_tuples', 'dead_tuples', 'mod_since_analyze', 'dead_ratio',
+                    'table_bytes', 'index_bytes', 'total_bytes', 'last_analyze', 'last_vacuum',
+                    'analyzed', 'needs_vacuum']
+        registros = df_stats[columnas].astype(object).where(df_stats[columnas].notna(), None).to_dict('records')
+        conn.execute(text(f"""
+            INSERT INTO {self.schema}.{self.HISTORY} ({", ".join(columnas)})
+            VALUES ({", ".join(f":{col}" for col in columnas)})
+        """), registros)
+
+        analizadas = df_stats.loc[df_stats['analyzed'], 'table_name'].tolist()
+        print(f"🧹 Mantenimiento: ANALYZE en {len(analizadas)} de {len(df_stats)} tablas {analizadas}.")
+        for row in df_stats[df_stats['needs_vacuum']].itertuples():
+            print(f"⚠️ {self.schema}.{row.table_name}: {row.dead_tuples} tuplas muertas ({row.dead_ratio:.0%}); "
+                  f"conviene VACUUM (ANALYZE) {self.schema}.{row.table_name}")
+        return df_stats
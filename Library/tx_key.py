@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+class TxKey:
+    """
+    Llave sustituta de un movimiento: los primeros 8 bytes del md5 de
+    'fecha|unique_concept|cargo|abono' como BIGINT con signo. Es determinista, así que la
+    calculan igual la carga (compute, sobre el DataFrame ya sanitizado) y la base
+    (función banorte_load.tx_key, para migraciones y consultas a mano).
+    Los cruces entre movimientos y *_conceptos se hacen por esta sola columna en lugar de
+    las cuatro de la llave primaria, que siguen en la tabla como atributos.
+
+    El md5 se calcula por columnas (md5_prefix): las 64 operaciones de cada bloque de
+    64 bytes corren sobre arreglos uint32 con un elemento por renglón, en lugar de una
+    llamada a hashlib por renglón.
+    """
+    KEY_COLUMNS = ('fecha', 'unique_concept', 'cargo', 'abono')
+    COLUMN = 'tx_key'
+    # Renglones por pasada del md5: los arreglos de trabajo caben en caché
+    MD5_BATCH_ROWS = 4096
+
+    # Constantes de md5 (RFC 1321): corrimiento y seno de cada uno de los 64 pasos
+    _MD5_SHIFTS = np.array([7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4,
+                           dtype='uint32')
+    _MD5_SINES = np.floor(np.abs(np.sin(np.arange(1, 65))) * 2 ** 32).astype('uint32')
+    _MD5_WORDS = np.array([i if i < 16 else (5 * i + 1) % 16 if i < 32 else (3 * i + 5) % 16 if i < 48 else (7 * i) % 16
+                           for i in range(64)])
+    _MD5_INIT = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476)
+
+    @classmethod
+    def compute(cls, df):
+        """
+        tx_key Int64 de cada renglón de un DataFrame ya pasado por StagingLoader.sanitize
+        (montos como texto 'pesos.cc', fechas sin nulos), con el mismo texto que
+        banorte_load.tx_key arma con fecha::text y round(monto, 2)::text.
+        """
+        fecha = df['fecha']
+        if not pd.api.types.is_datetime64_any_dtype(fecha.dtype):
+            fecha = pd.to_datetime(fecha.astype(object))
+        partes = [fecha.dt.strftime('%Y-%m-%d')] + [df[col].astype(object) for col in cls.KEY_COLUMNS[1:]]
+        partes = [parte.where(parte.notna(), '').astype(str).reset_index(drop=True) for parte in partes]
+        if ARROW_AVAILABLE:
+            textos = pc.binary_join_element_wise(*(pa.array(parte, type=pa.large_string()) for parte in partes), pa.scalar('|', pa.large_string()))
+        else:
+            textos = partes[0].str.cat(partes[1:], sep='|')
+        return pd.Series(cls.md5_prefix(textos), index=df.index, dtype='Int64')
+
+    @classmethod
+    def md5_prefix(cls, textos):
+        """Primeros 8 bytes del md5 (UTF-8) de cada texto como int64 big-endian con signo."""
+        datos, offsets = cls._utf8(textos)
+        largos = np.diff(offsets)
+        llaves = np.empty(len(largos), dtype='int64')
+        # Bloques de 64 bytes tras el relleno (0x80 + largo en bits); se agrupa por número de bloques
+        bloques = (largos + 8) // 64 + 1
+        if len(largos):
+            # Ceros al final para que la ventana del último texto no se salga del arreglo
+            datos = np.concatenate([datos, np.zeros(int(bloques.max()) * 64, dtype='uint8')])
+        for n in np.unique(bloques):
+            filas = np.flatnonzero(bloques == n)
+            for inicio in range(0, len(filas), cls.MD5_BATCH_ROWS):
+                lote = filas[inicio:inicio + cls.MD5_BATCH_ROWS]
+                llaves[lote] = cls._md5_blocks(datos, offsets[lote], largos[lote], int(n))
+        return llaves
+
+    @staticmethod
+    def _utf8(textos):
+        """Bytes UTF-8 de todos los textos seguidos y el offset de inicio de cada uno (n + 1)."""
+        if ARROW_AVAILABLE:
+            # Arrow ya guarda el texto así; con el dtype str de pandas no hay copia
+            arreglo = textos if isinstance(textos, pa.Array) else pa.array(textos, type=pa.large_string())
+            if arreglo.offset:
+                arreglo = pa.concat_arrays([arreglo])
+            _, offsets, datos = arreglo.buffers()
+            offsets = np.frombuffer(offsets, dtype='int64')[:len(arreglo) + 1]
+            datos = np.frombuffer(datos, dtype='uint8') if datos is not None else np.empty(0, dtype='uint8')
+            return datos, offsets
+        codificados = pd.Series(textos, dtype=object).str.encode('utf-8')
+        offsets = np.concatenate([[0], np.cumsum(codificados.str.len().to_numpy(dtype='int64'))])
+        return np.frombuffer(b''.join(codificados), dtype='uint8'), offsets
+
+    @classmethod
+    def _md5_blocks(cls, datos, inicios, largos, n):
+        # Mensajes con relleno en una matriz (renglones, n * 64) de bytes
+        ancho = n * 64
+        # Ventana de `ancho` bytes desde el inicio de cada texto; lo que pasa del largo es de otro
+        crudo = np.lib.stride_tricks.sliding_window_view(datos, ancho)[inicios]
+        crudo *= np.arange(ancho) < largos[:, None]
+        crudo[np.arange(len(largos)), largos] = 0x80
+        crudo[:, ancho - 8:] = (largos.astype('uint64') * 8).view('uint8').reshape(len(largos), 8)
+        # Palabra × renglón: cada paso lee una fila contigua
+        palabras = np.ascontiguousarray(crudo.view('<u4').reshape(len(largos), n, 16).transpose(1, 2, 0))
+
+        estado = [np.full(len(largos), valor, dtype='uint32') for valor in cls._MD5_INIT]
+        for bloque in range(n):
+            m = palabras[bloque]
+            a, b, c, d = estado
+            for i in range(64):
+                if i < 16:
+                    f = (b & c) | (~b & d)
+                elif i < 32:
+                    f = (d & b) | (~d & c)
+                elif i < 48:
+                    f = b ^ c ^ d
+                else:
+                    f = c ^ (b | ~d)
+                f = f + a + cls._MD5_SINES[i] + m[cls._MD5_WORDS[i]]
+                s = cls._MD5_SHIFTS[i]
+                a, d, c = d, c, b
+                b = b + ((f << s) | (f >> (np.uint32(32) - s)))
+            estado = [x + y for x, y in zip(estado, (a, b, c, d))]
+
+        # El digest es a, b, c, d en little-endian; los 8 primeros bytes se leen big-endian
+        alto = estado[0].byteswap().astype('uint64') << np.uint64(32)
+        return (alto | estado[1].byteswap().astype('uint64')).view('int64')
+
+    @classmethod
+    def assign(cls, df):
+        """Regresa df con la columna tx_key (re)calculada."""
+        return df.assign(**{cls.COLUMN: cls.compute(df)})
@@ -13,6 +13,8 @@ BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BASE_PATH not in sys.path:
     sys.path.insert(0, BASE_PATH)
 
+from Library.sql_reader import SqlReader
+
 env_file = os.path.join(BASE_PATH, ".env")
 
 # Si no existe el .env, redirigir al usuario a configurar bases de datos
@@ -93,15 +95,18 @@ query_cutoff_days       = f"SELECT * FROM {schema}.cutoff_days"
 query_cutoff_years      = f"SELECT * FROM {schema}.cutoff_years"
 query_account_cutoffs   = f"SELECT * FROM {schema}.account_cutoffs"
 
+# Lecturas grandes por COPY; las chicas siguen con pd.read_sql
+sql_reader = SqlReader(data_access.get("fast_read_min_rows", 10000))
+
 tables_ok = True
 df_accounts = df_cutoff_days = df_cutoff_years = df_account_cutoffs = None
 error_msg = None
 
 try:
-    df_accounts = pd.read_sql(query_accounts, connexion)
-    df_cutoff_days = pd.read_sql(query_cutoff_days, connexion)
-    df_cutoff_years = pd.read_sql(query_cutoff_years, connexion)
-    df_account_cutoffs = pd.read_sql(query_account_cutoffs, connexion)
+    df_accounts = sql_reader.read(connexion, query_accounts)
+    df_cutoff_days = sql_reader.read(connexion, query_cutoff_days)
+    df_cutoff_years = sql_reader.read(connexion, query_cutoff_years)
+    df_account_cutoffs = sql_reader.read(connexion, query_account_cutoffs)
 except Exception as e:
     tables_ok = False
     error_msg = str(e)
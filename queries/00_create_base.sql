@@ -21,6 +21,7 @@ CREATE TABLE IF NOT EXISTS banorte_load.debito_cerrado (
     cuenta TEXT REFERENCES banorte_load.accounts(account_number),
     unique_concept TEXT,
     period TEXT DEFAULT NULL,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono)
 );
 
@@ -36,6 +37,7 @@ CREATE TABLE IF NOT EXISTS banorte_load.debito_abierto (
     cuenta TEXT REFERENCES banorte_load.accounts(account_number),
     unique_concept TEXT,
     period TEXT DEFAULT NULL,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono)
 );
 
@@ -51,6 +53,7 @@ CREATE TABLE IF NOT EXISTS banorte_load.credito_cerrado (
     cuenta TEXT REFERENCES banorte_load.accounts(account_number),
     unique_concept TEXT,
     period TEXT DEFAULT NULL,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono)
 );
 
@@ -66,9 +69,76 @@ CREATE TABLE IF NOT EXISTS banorte_load.credito_abierto (
     cuenta TEXT REFERENCES banorte_load.accounts(account_number),
     unique_concept TEXT,
     period TEXT DEFAULT NULL,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono)
 );
 
+-- Ledger de archivos cerrados cargados (por hash de contenido)
+CREATE TABLE IF NOT EXISTS banorte_load.ingest_ledger (
+    file_hash TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    cuenta TEXT,
+    target TEXT,
+    row_count INTEGER,
+    loaded_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Planes de meses sin intereses (último archivo MSI por cuenta)
+CREATE TABLE IF NOT EXISTS banorte_load.msi_planes (
+    cuenta TEXT NOT NULL,
+    fecha_operacion DATE NOT NULL,
+    unique_concept TEXT NOT NULL,
+    importe_inicial NUMERIC(12,2) NOT NULL,
+    concepto TEXT,
+    tasa_anual NUMERIC(8,4),
+    importe_pendiente NUMERIC(12,2),
+    pagos_pendientes INTEGER,
+    mensualidad NUMERIC(12,2),
+    file_name TEXT,
+    file_date DATE,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (cuenta, fecha_operacion, unique_concept, importe_inicial)
+);
+
+-- Mensualidades pendientes de cada plan, una por fecha de corte
+CREATE TABLE IF NOT EXISTS banorte_load.msi_mensualidades (
+    cuenta TEXT NOT NULL,
+    fecha_operacion DATE NOT NULL,
+    unique_concept TEXT NOT NULL,
+    importe_inicial NUMERIC(12,2) NOT NULL,
+    fecha_corte DATE NOT NULL,
+    period TEXT NOT NULL,
+    pago_restante INTEGER NOT NULL,
+    mensualidad NUMERIC(12,2) NOT NULL,
+    concepto TEXT,
+    file_date DATE,
+    PRIMARY KEY (cuenta, fecha_operacion, unique_concept, importe_inicial, fecha_corte),
+    FOREIGN KEY (cuenta, fecha_operacion, unique_concept, importe_inicial)
+        REFERENCES banorte_load.msi_planes (cuenta, fecha_operacion, unique_concept, importe_inicial)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS msi_mensualidades_corte_idx
+    ON banorte_load.msi_mensualidades (fecha_corte, cuenta) INCLUDE (mensualidad);
+
+-- Historia de estadísticas por tabla que guarda el mantenimiento al final de cada carga
+CREATE TABLE IF NOT EXISTS banorte_load.table_stats_history (
+    table_name TEXT NOT NULL,
+    captured_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    live_tuples BIGINT,
+    dead_tuples BIGINT,
+    mod_since_analyze BIGINT,
+    dead_ratio NUMERIC(6,4),
+    table_bytes BIGINT,
+    index_bytes BIGINT,
+    total_bytes BIGINT,
+    last_analyze TIMESTAMPTZ,
+    last_vacuum TIMESTAMPTZ,
+    analyzed BOOLEAN NOT NULL DEFAULT FALSE,
+    needs_vacuum BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (table_name, captured_at)
+);
+
 -----------------
 ---CUTOFF DAYS---
 -----------------
@@ -185,6 +255,7 @@ CREATE TABLE IF NOT EXISTS banorte_load.credito_conceptos (
     category_subgroup TEXT,
     beneficiario TEXT,
     updated_at TIMESTAMP DEFAULT NOW(),
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono),
     FOREIGN KEY (category_group, category_subgroup)
         REFERENCES banorte_load.category("group", subgroup)
@@ -209,6 +280,7 @@ CREATE TABLE IF NOT EXISTS banorte_load.debito_conceptos (
     category_subgroup TEXT,
     beneficiario TEXT,
     updated_at TIMESTAMP DEFAULT NOW(),
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unique_concept, cargo, abono),
     FOREIGN KEY (category_group, category_subgroup)
         REFERENCES banorte_load.category("group", subgroup)
@@ -221,118 +293,139 @@ CREATE TABLE IF NOT EXISTS banorte_load.debito_conceptos (
 );
 
 -- ===========================================
--- Función de sincronización 
+-- Llave sustituta tx_key
 -- ===========================================
+-- Primeros 8 bytes de md5('fecha|unique_concept|cargo|abono') como BIGINT; la carga la
+-- calcula igual en Python (TxKey.compute). Los cruces movimientos ↔ conceptos van por aquí.
+
+CREATE OR REPLACE FUNCTION banorte_load.tx_key(fecha DATE, unique_concept TEXT, cargo NUMERIC, abono NUMERIC)
+RETURNS BIGINT AS $$
+    SELECT ('x' || substr(md5(concat_ws('|',
+        coalesce(to_char(fecha, 'YYYY-MM-DD'), ''),
+        coalesce(unique_concept, ''),
+        coalesce(round(cargo, 2)::text, ''),
+        coalesce(round(abono, 2)::text, '')
+    )), 1, 16))::bit(64)::bigint;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE INDEX IF NOT EXISTS debito_cerrado_tx_key_idx ON banorte_load.debito_cerrado (tx_key);
+CREATE INDEX IF NOT EXISTS debito_abierto_tx_key_idx ON banorte_load.debito_abierto (tx_key);
+CREATE INDEX IF NOT EXISTS credito_cerrado_tx_key_idx ON banorte_load.credito_cerrado (tx_key);
+CREATE INDEX IF NOT EXISTS credito_abierto_tx_key_idx ON banorte_load.credito_abierto (tx_key);
+CREATE INDEX IF NOT EXISTS debito_conceptos_tx_key_idx ON banorte_load.debito_conceptos (tx_key);
+CREATE INDEX IF NOT EXISTS credito_conceptos_tx_key_idx ON banorte_load.credito_conceptos (tx_key);
+
+-- Último cierre por cuenta (huérfanos de la promoción abierto → cerrado)
+CREATE INDEX IF NOT EXISTS debito_cerrado_cuenta_fecha_idx ON banorte_load.debito_cerrado (cuenta, fecha);
+CREATE INDEX IF NOT EXISTS credito_cerrado_cuenta_fecha_idx ON banorte_load.credito_cerrado (cuenta, fecha);
 
-CREATE OR REPLACE FUNCTION banorte_load.sync_conceptos()
+-- ===========================================
+-- Función de sincronización 
+-- ===========================================
+-- Una ejecución por sentencia: las filas afectadas llegan en las tablas de transición
+-- (nuevos / viejos) y se sincronizan con un solo INSERT ... SELECT ... ON CONFLICT.
+-- Reglas (las mismas de la versión por renglón):
+--   * INSERT: toda fila nueva; UPDATE: sólo si cambió el estado.
+--   * Sólo cuentas de banorte_load.accounts cuyo tipo coincide con la familia de la
+--     tabla (credito → credit, debito → debit); el resto se ignora con un aviso.
+-- TG_ARGV[0] es la familia ('credito' | 'debito'), así también sirve para copias de la tabla.
+
+CREATE OR REPLACE FUNCTION banorte_load.sync_conceptos_bulk()
 RETURNS TRIGGER AS $$
 DECLARE
-    cuenta_tipo TEXT;
+    familia TEXT := TG_ARGV[0];
+    tipo_cuenta TEXT := CASE TG_ARGV[0] WHEN 'credito' THEN 'credit' ELSE 'debit' END;
+    filas TEXT := 'SELECT n.* FROM nuevos n';
+    ignorados BIGINT;
 BEGIN
-    -- Obtener tipo de cuenta desde la tabla accounts
-    SELECT type INTO cuenta_tipo
-    FROM banorte_load.accounts
-    WHERE account_number = NEW.cuenta;
-
-    -- Evitar procesamiento si no existe cuenta o tipo no definido
-    IF cuenta_tipo IS NULL THEN
-        RAISE NOTICE '⚠️ Cuenta % no encontrada en tabla accounts. Registro ignorado.', NEW.cuenta;
-        RETURN NEW;
+    -- Sentencias que no tocaron renglones: no hay nada que sincronizar
+    IF NOT EXISTS (SELECT 1 FROM nuevos) THEN
+        RETURN NULL;
     END IF;
 
-    -- Solo ejecutar si es una inserción o si el estado cambió
-    IF (TG_OP = 'INSERT') OR (TG_OP = 'UPDATE' AND NEW.estado IS DISTINCT FROM OLD.estado) THEN
-
-        -- Créditos → Solo si la cuenta es tipo "credit"
-        IF TG_TABLE_NAME IN ('credito_abierto', 'credito_cerrado') AND cuenta_tipo = 'credit' THEN
-            INSERT INTO banorte_load.credito_conceptos (
-                fecha, unique_concept, cargo, abono, concepto, cuenta, estado, updated_at
-            )
-            VALUES (
-                NEW.fecha, NEW.unique_concept, NEW.cargo, NEW.abono, NEW.concepto, NEW.cuenta, NEW.estado, NOW()
-            )
-            ON CONFLICT (fecha, unique_concept, cargo, abono)
-            DO UPDATE SET 
-                estado = EXCLUDED.estado,
-                updated_at = NOW();
-
-        -- Débitos → Solo si la cuenta es tipo "debit"
-        ELSIF TG_TABLE_NAME IN ('debito_abierto', 'debito_cerrado') AND cuenta_tipo = 'debit' THEN
-            INSERT INTO banorte_load.debito_conceptos (
-                fecha, unique_concept, cargo, abono, concepto, cuenta, estado, updated_at
-            )
-            VALUES (
-                NEW.fecha, NEW.unique_concept, NEW.cargo, NEW.abono, NEW.concepto, NEW.cuenta, NEW.estado, NOW()
-            )
-            ON CONFLICT (fecha, unique_concept, cargo, abono)
-            DO UPDATE SET 
-                estado = EXCLUDED.estado,
-                updated_at = NOW();
-
-        ELSE
-            -- Si la cuenta no coincide con el tipo esperado, ignoramos
-            RAISE NOTICE '⚠️ Registro ignorado: cuenta % pertenece a tipo %, pero proviene de tabla %',
-                NEW.cuenta, cuenta_tipo, TG_TABLE_NAME;
-        END IF;
+    IF TG_OP = 'UPDATE' THEN
+        filas := filas || ' JOIN viejos o USING (tx_key)'
+                       || ' WHERE n.estado IS DISTINCT FROM o.estado';
     END IF;
 
-    RETURN NEW;
+    EXECUTE format(
+        'INSERT INTO banorte_load.%I (fecha, unique_concept, cargo, abono, concepto, cuenta, estado, tx_key, updated_at) '
+        'SELECT f.fecha, f.unique_concept, f.cargo, f.abono, f.concepto, f.cuenta, f.estado, f.tx_key, NOW() '
+        'FROM (%s) f JOIN banorte_load.accounts a ON a.account_number = f.cuenta AND a.type = %L '
+        'ON CONFLICT (fecha, unique_concept, cargo, abono) '
+        'DO UPDATE SET estado = EXCLUDED.estado, tx_key = EXCLUDED.tx_key, updated_at = NOW()',
+        familia || '_conceptos', filas, tipo_cuenta
+    );
+
+    EXECUTE format(
+        'SELECT COUNT(*) FROM (%s) f LEFT JOIN banorte_load.accounts a ON a.account_number = f.cuenta '
+        'WHERE a.type IS DISTINCT FROM %L',
+        filas, tipo_cuenta
+    ) INTO ignorados;
+    IF ignorados > 0 THEN
+        RAISE NOTICE '⚠️ % registros de % ignorados: cuenta inexistente o de otro tipo.', ignorados, TG_TABLE_NAME;
+    END IF;
+
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 -- ===========================================
 -- Triggers de sincronización automática
 -- ===========================================
+-- Las tablas de transición exigen un trigger por evento (INSERT / UPDATE).
+-- Única definición de la función y de los triggers: las migraciones 02 y 03 no los
+-- repiten; en una base existente se vuelve a correr este archivo después de ellas.
 
 -- Créditos
-CREATE OR REPLACE TRIGGER trg_sync_credito_abierto
-AFTER INSERT OR UPDATE ON banorte_load.credito_abierto
-FOR EACH ROW EXECUTE FUNCTION banorte_load.sync_conceptos();
-
-CREATE OR REPLACE TRIGGER trg_sync_credito_cerrado
-AFTER INSERT OR UPDATE ON banorte_load.credito_cerrado
-FOR EACH ROW EXECUTE FUNCTION banorte_load.sync_conceptos();
+CREATE OR REPLACE TRIGGER trg_sync_credito_abierto_ins
+AFTER INSERT ON banorte_load.credito_abierto
+REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('credito');
+
+CREATE OR REPLACE TRIGGER trg_sync_credito_abierto_upd
+AFTER UPDATE ON banorte_load.credito_abierto
+REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('credito');
+
+CREATE OR REPLACE TRIGGER trg_sync_credito_cerrado_ins
+AFTER INSERT ON banorte_load.credito_cerrado
+REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('credito');
+
+CREATE OR REPLACE TRIGGER trg_sync_credito_cerrado_upd
+AFTER UPDATE ON banorte_load.credito_cerrado
+REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('credito');
 
 -- Débitos
-CREATE OR REPLACE TRIGGER trg_sync_debito_abierto
-AFTER INSERT OR UPDATE ON banorte_load.debito_abierto
-FOR EACH ROW EXECUTE FUNCTION banorte_load.sync_conceptos();
-
-CREATE OR REPLACE TRIGGER trg_sync_debito_cerrado
-AFTER INSERT OR UPDATE ON banorte_load.debito_cerrado
-FOR EACH ROW EXECUTE FUNCTION banorte_load.sync_conceptos();
-
--- 1️⃣ Función genérica para extraer periodo del file_name de todas las tablas
-CREATE OR REPLACE FUNCTION banorte_load.set_period_from_filename()
-RETURNS TRIGGER AS $$
-DECLARE
-    extracted_period TEXT;
-BEGIN
-    -- Extraer patrón AAAA-MM si existe
-    extracted_period := substring(NEW.file_name FROM '([0-9]{4}-[0-9]{2})');
-
-    -- Asignar sólo si period está vacío y el formato es válido
-    IF NEW.period IS NULL AND extracted_period ~ '^[0-9]{4}-[0-9]{2}$' THEN
-        NEW.period := extracted_period;
-    END IF;
-
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
--- 2️⃣ Aplicar a DEBITO_CERRADO
+CREATE OR REPLACE TRIGGER trg_sync_debito_abierto_ins
+AFTER INSERT ON banorte_load.debito_abierto
+REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('debito');
+
+CREATE OR REPLACE TRIGGER trg_sync_debito_abierto_upd
+AFTER UPDATE ON banorte_load.debito_abierto
+REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('debito');
+
+CREATE OR REPLACE TRIGGER trg_sync_debito_cerrado_ins
+AFTER INSERT ON banorte_load.debito_cerrado
+REFERENCING NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('debito');
+
+CREATE OR REPLACE TRIGGER trg_sync_debito_cerrado_upd
+AFTER UPDATE ON banorte_load.debito_cerrado
+REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+FOR EACH STATEMENT EXECUTE FUNCTION banorte_load.sync_conceptos_bulk('debito');
+
+-- El period lo asigna CutoffCalendar en la carga (búsqueda binaria sobre los cortes de
+-- cada cuenta en account_cutoffs / cutoff_days): crédito = periodo del primer corte >= fecha,
+-- débito = mes de la fecha; un débito cerrado toma el mes de file_name, como hacía el
+-- trigger por renglón que aquí se retira.
 DROP TRIGGER IF EXISTS trg_set_period_debito_cerrado ON banorte_load.debito_cerrado;
-CREATE TRIGGER trg_set_period_debito_cerrado
-BEFORE INSERT OR UPDATE ON banorte_load.debito_cerrado
-FOR EACH ROW
-EXECUTE FUNCTION banorte_load.set_period_from_filename();
-
--- 3️⃣ Aplicar a CREDITO_CERRADO
 DROP TRIGGER IF EXISTS trg_set_period_credito_cerrado ON banorte_load.credito_cerrado;
-CREATE TRIGGER trg_set_period_credito_cerrado
-BEFORE INSERT OR UPDATE ON banorte_load.credito_cerrado
-FOR EACH ROW
-EXECUTE FUNCTION banorte_load.set_period_from_filename();
+DROP FUNCTION IF EXISTS banorte_load.set_period_from_filename();
 
 -----------------------------------------
 -- Generate historical cutoff periods per account
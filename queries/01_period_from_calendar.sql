@@ -0,0 +1,6 @@
+-- Migración para bases existentes: el period ahora lo asigna CutoffCalendar en Python.
+-- Se retiran los triggers por renglón que lo extraían de file_name.
+DROP TRIGGER IF EXISTS trg_set_period_debito_cerrado ON banorte_load.debito_cerrado;
+DROP TRIGGER IF EXISTS trg_set_period_credito_cerrado ON banorte_load.credito_cerrado;
+DROP FUNCTION IF EXISTS banorte_load.set_period_from_filename();
+
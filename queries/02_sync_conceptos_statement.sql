@@ -0,0 +1,10 @@
+-- Migración para bases existentes: retira la sincronización de conceptos por renglón.
+-- La función por sentencia (sync_conceptos_bulk) y sus triggers se definen sólo en
+-- 00_create_base.sql. Orden en una base existente: 02, 03 y luego 00_create_base.sql
+-- (idempotente), que crea la función vigente y los triggers por sentencia.
+
+DROP TRIGGER IF EXISTS trg_sync_credito_abierto ON banorte_load.credito_abierto;
+DROP TRIGGER IF EXISTS trg_sync_credito_cerrado ON banorte_load.credito_cerrado;
+DROP TRIGGER IF EXISTS trg_sync_debito_abierto ON banorte_load.debito_abierto;
+DROP TRIGGER IF EXISTS trg_sync_debito_cerrado ON banorte_load.debito_cerrado;
+DROP FUNCTION IF EXISTS banorte_load.sync_conceptos();
@@ -0,0 +1,49 @@
+-- Migración para bases existentes: columna tx_key en movimientos y conceptos, su función,
+-- su índice y el llenado de los renglones ya cargados.
+-- sync_conceptos_bulk (que cruza nuevos/viejos por tx_key) no se define aquí: después de
+-- esta migración se vuelve a correr 00_create_base.sql, su única definición.
+
+ALTER TABLE banorte_load.debito_cerrado ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+ALTER TABLE banorte_load.debito_abierto ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+ALTER TABLE banorte_load.credito_cerrado ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+ALTER TABLE banorte_load.credito_abierto ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+ALTER TABLE banorte_load.debito_conceptos ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+ALTER TABLE banorte_load.credito_conceptos ADD COLUMN IF NOT EXISTS tx_key BIGINT;
+
+-- ===========================================
+-- Llave sustituta tx_key
+-- ===========================================
+-- Primeros 8 bytes de md5('fecha|unique_concept|cargo|abono') como BIGINT; la carga la
+-- calcula igual en Python (TxKey.compute). Los cruces movimientos ↔ conceptos van por aquí.
+
+CREATE OR REPLACE FUNCTION banorte_load.tx_key(fecha DATE, unique_concept TEXT, cargo NUMERIC, abono NUMERIC)
+RETURNS BIGINT AS $$
+    SELECT ('x' || substr(md5(concat_ws('|',
+        coalesce(to_char(fecha, 'YYYY-MM-DD'), ''),
+        coalesce(unique_concept, ''),
+        coalesce(round(cargo, 2)::text, ''),
+        coalesce(round(abono, 2)::text, '')
+    )), 1, 16))::bit(64)::bigint;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE INDEX IF NOT EXISTS debito_cerrado_tx_key_idx ON banorte_load.debito_cerrado (tx_key);
+CREATE INDEX IF NOT EXISTS debito_abierto_tx_key_idx ON banorte_load.debito_abierto (tx_key);
+CREATE INDEX IF NOT EXISTS credito_cerrado_tx_key_idx ON banorte_load.credito_cerrado (tx_key);
+CREATE INDEX IF NOT EXISTS credito_abierto_tx_key_idx ON banorte_load.credito_abierto (tx_key);
+CREATE INDEX IF NOT EXISTS debito_conceptos_tx_key_idx ON banorte_load.debito_conceptos (tx_key);
+CREATE INDEX IF NOT EXISTS credito_conceptos_tx_key_idx ON banorte_load.credito_conceptos (tx_key);
+
+-- Renglones ya cargados
+UPDATE banorte_load.debito_cerrado SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+UPDATE banorte_load.debito_abierto SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+UPDATE banorte_load.credito_cerrado SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+UPDATE banorte_load.credito_abierto SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+UPDATE banorte_load.debito_conceptos SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+UPDATE banorte_load.credito_conceptos SET tx_key = banorte_load.tx_key(fecha, unique_concept, cargo, abono) WHERE tx_key IS NULL;
+
+ANALYZE banorte_load.debito_cerrado;
+ANALYZE banorte_load.debito_abierto;
+ANALYZE banorte_load.credito_cerrado;
+ANALYZE banorte_load.credito_abierto;
+ANALYZE banorte_load.debito_conceptos;
+ANALYZE banorte_load.credito_conceptos;
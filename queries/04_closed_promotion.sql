@@ -0,0 +1,5 @@
+-- Migración para bases existentes: índice del último cierre por cuenta que usa
+-- ClosedPromotion para detectar huérfanos (misma definición que 00_create_base.sql).
+
+CREATE INDEX IF NOT EXISTS debito_cerrado_cuenta_fecha_idx ON banorte_load.debito_cerrado (cuenta, fecha);
+CREATE INDEX IF NOT EXISTS credito_cerrado_cuenta_fecha_idx ON banorte_load.credito_cerrado (cuenta, fecha);
@@ -22,23 +22,21 @@ CREATE TABLE banking_info.credito_cerrado (
     concepto_procesado TEXT,
     ubicacion TEXT,
     file_date DATE,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unic_concept, cargo, abono)
 );
 
 INSERT INTO banking_info.credito_cerrado (
     fecha, unic_concept, cargo, abono, concepto, estado,
-    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date
+    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date, tx_key
 )
 SELECT
     c.fecha, c.unic_concept, c.cargo, c.abono, c.concepto, c.estado,
     cc.beneficiario, cc.categoria, cc.grupo, cc.id_presupuesto, cc.concepto_procesado, cc.ubicacion,
-    c.file_date
+    c.file_date, c.tx_key
 FROM banorte_load.credito_cerrado c
 LEFT JOIN banorte_load.credito_conceptos cc
-  ON c.fecha = cc.fecha
- AND c.unic_concept = cc.unic_concept
- AND c.cargo IS NOT DISTINCT FROM cc.cargo
- AND c.abono IS NOT DISTINCT FROM cc.abono;
+  ON c.tx_key = cc.tx_key;
 
 -- =========================================================
 -- 2) CRÉDITO CORRIENTE + conceptos
@@ -58,23 +56,21 @@ CREATE TABLE banking_info.credito_corriente (
     concepto_procesado TEXT,
     ubicacion TEXT,
     file_date DATE,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unic_concept, cargo, abono)
 );
 
 INSERT INTO banking_info.credito_corriente (
     fecha, unic_concept, cargo, abono, concepto, estado,
-    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date
+    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date, tx_key
 )
 SELECT
     c.fecha, c.unic_concept, c.cargo, c.abono, c.concepto, c.estado,
     cc.beneficiario, cc.categoria, cc.grupo, cc.id_presupuesto, cc.concepto_procesado, cc.ubicacion,
-    c.file_date
+    c.file_date, c.tx_key
 FROM banorte_load.credito_corriente c
 LEFT JOIN banorte_load.credito_conceptos cc
-  ON c.fecha = cc.fecha
- AND c.unic_concept = cc.unic_concept
- AND c.cargo IS NOT DISTINCT FROM cc.cargo
- AND c.abono IS NOT DISTINCT FROM cc.abono;
+  ON c.tx_key = cc.tx_key;
 
 -- =========================================================
 -- 3) DÉBITO CERRADO + conceptos
@@ -94,23 +90,21 @@ CREATE TABLE banking_info.debito_cerrado (
     concepto_procesado TEXT,
     ubicacion TEXT,
     file_date DATE,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unic_concept, cargo, abono)
 );
 
 INSERT INTO banking_info.debito_cerrado (
     fecha, unic_concept, cargo, abono, concepto, estado,
-    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date
+    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date, tx_key
 )
 SELECT
     d.fecha, d.unic_concept, d.cargo, d.abono, d.concepto, d.estado,
     dc.beneficiario, dc.categoria, dc.grupo, dc.id_presupuesto, dc.concepto_procesado, dc.ubicacion,
-    d.file_date
+    d.file_date, d.tx_key
 FROM banorte_load.debito_cerrado d
 LEFT JOIN banorte_load.debito_conceptos dc
-  ON d.fecha = dc.fecha
- AND d.unic_concept = dc.unic_concept
- AND d.cargo IS NOT DISTINCT FROM dc.cargo
- AND d.abono IS NOT DISTINCT FROM dc.abono;
+  ON d.tx_key = dc.tx_key;
 
 -- =========================================================
 -- 4) DÉBITO CORRIENTE + conceptos
@@ -130,22 +124,20 @@ CREATE TABLE banking_info.debito_corriente (
     concepto_procesado TEXT,
     ubicacion TEXT,
     file_date DATE,
+    tx_key BIGINT,
     PRIMARY KEY (fecha, unic_concept, cargo, abono)
 );
 
 INSERT INTO banking_info.debito_corriente (
     fecha, unic_concept, cargo, abono, concepto, estado,
-    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date
+    beneficiario, categoria, grupo, id_presupuesto, concepto_procesado, ubicacion, file_date, tx_key
 )
 SELECT
     d.fecha, d.unic_concept, d.cargo, d.abono, d.concepto, d.estado,
     dc.beneficiario, dc.categoria, dc.grupo, dc.id_presupuesto, dc.concepto_procesado, dc.ubicacion,
-    d.file_date
+    d.file_date, d.tx_key
 FROM banorte_load.debito_corriente d
 LEFT JOIN banorte_load.debito_conceptos dc
-  ON d.fecha = dc.fecha
- AND d.unic_concept = dc.unic_concept
- AND d.cargo IS NOT DISTINCT FROM dc.cargo
- AND d.abono IS NOT DISTINCT FROM dc.abono;
+  ON d.tx_key = dc.tx_key;
 
 COMMIT;
\ No newline at end of file
@@ -0,0 +1,18 @@
+-- Mensualidades MSI a pagar en los próximos 6 cortes, por periodo y cuenta
+-- (usa msi_mensualidades_corte_idx)
+SELECT
+    period,
+    cuenta,
+    COUNT(*) AS planes,
+    SUM(mensualidad) AS total
+FROM
+    banorte_load.msi_mensualidades
+WHERE
+    fecha_corte >= CURRENT_DATE
+    AND fecha_corte < CURRENT_DATE + INTERVAL '6 months'
+GROUP BY
+    period,
+    cuenta
+ORDER BY
+    period,
+    cuenta;
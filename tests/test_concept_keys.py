@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from Library.concept_keys import ConceptKeyCache
+
+
+def extract_unique_concept(val):
+    """Regla por renglón original de csv_to_sql (antes de ConceptKeyCache)."""
+    if pd.isna(val):
+        return ''
+    val_str = str(val)
+    digits = ''.join(filter(str.isdigit, val_str))
+    if digits:
+        return digits
+    letters = ''.join(filter(str.isalpha, val_str))
+    return letters
+
+
+CONCEPTOS = [
+    'SPEI ENVIADO 0123456 REF 99',
+    'OXXO',
+    'oxxo - sucursal centro',
+    'PAGO TDC *1234*',
+    'CAFÉ DEL ÁRBOL',       # letras fuera de ASCII
+    'Número ²³ ¼',           # superíndices y fracciones: isdigit unicode
+    '١٢٣ ARABIC',            # dígitos arábigo-índicos
+    '   ',
+    '',
+    None,
+    float('nan'),
+    12345,
+    'OXXO',                  # repetido
+]
+
+
+def test_derive_matches_per_row_rule():
+    serie = pd.Series(CONCEPTOS, dtype=object)
+    esperado = serie.apply(extract_unique_concept)
+    resultado = ConceptKeyCache().derive(serie)
+    assert resultado.tolist() == esperado.tolist()
+    assert resultado.index.equals(serie.index)
+
+
+@pytest.mark.parametrize('dtype', ['object', 'string', 'category'])
+def test_derive_accepts_column_dtypes(dtype):
+    serie = pd.Series(['SPEI 001', 'OXXO', None, 'SPEI 001'], index=[10, 11, 12, 13]).astype(dtype)
+    assert ConceptKeyCache().derive(serie).tolist() == ['001', 'OXXO', '', '001']
+
+
+def test_cache_persists_between_instances(tmp_path):
+    ruta = tmp_path / 'cache.pkl'
+    cache = ConceptKeyCache(str(ruta))
+    cache.derive(pd.Series(['UBER 77', 'NETFLIX']))
+    cache.save()
+    assert ConceptKeyCache(str(ruta)).keys == {'UBER 77': '77', 'NETFLIX': 'NETFLIX'}
+
+
+def test_remember_keeps_existing_keys():
+    cache = ConceptKeyCache()
+    cache.derive(pd.Series(['UBER 77']))
+    cache.remember(['UBER 77', 'AMAZON', None], ['otro', 'AMAZON', 'x'])
+    assert cache.keys == {'UBER 77': '77', 'AMAZON': 'AMAZON'}
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Library.cutoff_calendar import CutoffCalendar
+
+
+def calendario(meses):
+    """Cortes el día 6 de cada mes 'YYYY-MM' indicado, como populate_cutoff_days."""
+    return CutoffCalendar([f"{mes}-06" for mes in meses], list(meses))
+
+
+def test_cutoff_rule_uses_first_cutoff_on_or_after_date():
+    cal = calendario(['2024-01', '2024-02', '2024-03'])
+    fechas = pd.to_datetime(['2024-01-06', '2024-01-07', '2024-02-06', '2024-02-28'])
+    assert cal.assign_period(fechas, 'cutoff').astype(str).tolist() == ['2024-01', '2024-02', '2024-02', '2024-03']
+
+
+def test_month_rule_is_calendar_month():
+    cal = calendario(['2024-01'])
+    fechas = pd.to_datetime(['2024-01-31', '2024-02-01'])
+    assert cal.assign_period(fechas, 'month').astype(str).tolist() == ['2024-01', '2024-02']
+
+
+def test_missing_dates_stay_missing():
+    cal = calendario(['2024-01'])
+    periodos = cal.assign_period(pd.Series([pd.Timestamp('2024-01-02'), pd.NaT]), 'cutoff')
+    assert periodos.iloc[0] == '2024-01'
+    assert pd.isna(periodos.iloc[1])
+
+
+def test_dates_beyond_the_table_get_synthetic_cutoffs():
+    cal = calendario(['2024-01'])
+    fechas = pd.to_datetime(['2023-11-10', '2024-03-07'])
+    assert cal.assign_period(fechas, 'cutoff').astype(str).tolist() == ['2023-12', '2024-04']
+
+
+def test_missing_year_in_the_middle_is_filled():
+    meses = [f"2023-{m:02d}" for m in range(1, 13)] + [f"2025-{m:02d}" for m in range(1, 13)]
+    cal = calendario(meses)
+    fechas = pd.to_datetime(['2024-05-10', '2024-12-06', '2023-12-07'])
+    # Sin el relleno, todas tomarían el primer corte de 2025
+    assert cal.assign_period(fechas, 'cutoff').astype(str).tolist() == ['2024-06', '2024-12', '2024-01']
+
+
+def test_table_cutoffs_win_over_synthetic_ones():
+    # Un corte de la tabla en otro día no se duplica con el sintético del día 6
+    cal = CutoffCalendar(['2024-02-20'], ['2024-02']).cover('2024-02-01', '2024-02-28')
+    febrero = cal.fechas[cal.fechas.astype('datetime64[M]') == np.datetime64('2024-02')]
+    assert febrero.tolist() == [np.datetime64('2024-02-20', 'D')]
+
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError):
+        calendario(['2024-01']).assign_period(pd.to_datetime(['2024-01-01']), 'weekly')
+
+
+def calendario_con_cuentas(meses, cuentas):
+    """Calendario general de `meses` más los cortes propios {cuenta: [(fecha, periodo)]}."""
+    filas = [(cuenta, fecha, periodo) for cuenta, cortes in cuentas.items() for fecha, periodo in cortes]
+    df = pd.DataFrame(filas, columns=['account_number', 'fecha', 'periodo'])
+    return CutoffCalendar([f"{mes}-06" for mes in meses], list(meses), df)
+
+
+def test_each_account_uses_its_own_cutoffs():
+    cal = calendario_con_cuentas(['2024-01', '2024-02'], {'5678': [('2024-01-20', '2024-01')]})
+    fechas = pd.to_datetime(['2024-01-10'])
+    assert cal.for_account('5678').assign_period(fechas, 'cutoff').astype(str).tolist() == ['2024-01']
+    assert cal.for_account('1234').assign_period(fechas, 'cutoff').astype(str).tolist() == ['2024-02']
+
+
+def test_account_calendar_continues_with_general_cutoffs():
+    # account_cutoffs sólo trae periodos vencidos; los siguientes salen de cutoff_days
+    cal = calendario_con_cuentas(['2024-01', '2024-02', '2024-03'], {'5678': [('2024-01-20', '2024-01')]})
+    fechas = pd.to_datetime(['2024-01-25', '2024-02-10'])
+    assert cal.for_account('5678').assign_period(fechas, 'cutoff').astype(str).tolist() == ['2024-02', '2024-03']
+
+
+def test_period_from_filename():
+    assert CutoffCalendar.period_from_filename('2024-05_1234_debito.csv') == '2024-05'
+    assert CutoffCalendar.period_from_filename('movimientos_1234.csv') is None
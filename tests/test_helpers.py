@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from Library.helpers import Helper
+
+
+def corrige_fechas_por_renglon(df, columna_fecha):
+    """corrige_fechas original (un pd.to_datetime por renglón), como referencia."""
+    # object: con pandas 3 astype(str) ya no acepta Timestamps en la misma columna
+    df[columna_fecha] = df[columna_fecha].astype(str).astype(object)
+    for idx, valor in df[columna_fecha].items():
+        nuevo_valor = valor
+        try:
+            if '/' in str(valor):
+                nuevo_valor = pd.to_datetime(valor, format='%d/%m/%Y', errors='raise')
+            else:
+                nuevo_valor = pd.to_datetime(valor, errors='raise')
+            nuevo_valor = nuevo_valor.replace(hour=0, minute=0, second=0, microsecond=0)
+        except Exception:
+            nuevo_valor = valor
+        if not pd.isnull(nuevo_valor) and str(nuevo_valor) != valor:
+            df.at[idx, columna_fecha] = nuevo_valor
+    df[columna_fecha] = pd.to_datetime(df[columna_fecha], errors='coerce').dt.floor('D')
+    return df
+
+
+@pytest.mark.parametrize('valores', [
+    ['15/01/2024', '01/02/2024', '31/12/2023'],
+    ['2024-03-04', '2024-03-05 10:11:12', '2023-12-31'],
+    ['15/01/2024', 'basura', None],
+])
+def test_corrige_fechas_matches_row_by_row_version(valores):
+    esperado = corrige_fechas_por_renglon(pd.DataFrame({'fecha': valores}), 'fecha')['fecha']
+    obtenido = Helper.corrige_fechas(pd.DataFrame({'fecha': valores}), 'fecha')['fecha']
+    assert obtenido.astype('datetime64[ns]').tolist() == esperado.astype('datetime64[ns]').tolist()
+
+
+def test_parse_date_series_reports_unparsed_rows():
+    fechas, no_parseadas = Helper.parse_date_series(pd.Series(['15/01/2024', 'basura', None, '']))
+    assert fechas.iloc[0] == pd.Timestamp('2024-01-15')
+    assert fechas.iloc[1:].isna().all()
+    # Sólo lo que traía texto cuenta como no parseado; vacíos y nulos no
+    assert no_parseadas.tolist() == [False, True, False, False]
+
+
+def test_parse_date_series_is_always_day_first():
+    valores = ['05/03/2024 10:00', '13/03/2024 10:00', '05/03/2024 10:00:30', '5-3-2024']
+    fechas, no_parseadas = Helper.parse_date_series(pd.Series(valores))
+    assert not no_parseadas.any()
+    assert fechas.dt.strftime('%Y-%m-%d').tolist() == ['2024-03-05', '2024-03-13', '2024-03-05', '2024-03-05']
+
+
+def test_parse_date_series_keeps_year_first_text():
+    fechas, _ = Helper.parse_date_series(pd.Series(['2024/05/03', '2024-05-03T10:00', '2024-05-03']))
+    assert fechas.dt.strftime('%Y-%m-%d').tolist() == ['2024-05-03'] * 3
+
+
+def test_parse_date_series_truncates_to_day():
+    fechas, _ = Helper.parse_date_series(pd.to_datetime(pd.Series(['2024-01-15 23:59:59'])))
+    assert fechas.iloc[0] == pd.Timestamp('2024-01-15')
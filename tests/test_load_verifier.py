@@ -0,0 +1,64 @@
+import pandas as pd
+
+from Library.load_verifier import LoadVerifier
+
+
+def movimientos():
+    """Renglones ya sanitizados (montos como texto 'pesos.cc') con su tx_key."""
+    return pd.DataFrame({
+        'cuenta': ['1234', '1234', '1234', '5678'],
+        'period': ['2024-05', '2024-05', '2024-06', None],
+        'cargo': ['10.50', '0.00', '3.00', '199.00'],
+        'abono': ['0.00', '5.00', '0.00', '0.00'],
+        'saldo': ['100.00', '105.00', None, '1.10'],
+        'tx_key': pd.array([-1, 2 ** 63 - 1, 7, -(2 ** 63)], dtype='Int64'),
+    })
+
+
+def sumas(df):
+    return LoadVerifier.frame_checksums(df).set_index(LoadVerifier.PARTITION).sort_index()
+
+
+def test_sums_by_partition_in_cents():
+    df = sumas(movimientos())
+    mayo = df.loc[('1234', '2024-05')]
+    assert mayo['filas'] == 2
+    assert mayo['suma_cargo'] == 1050
+    assert mayo['suma_abono'] == 500
+    assert mayo['suma_saldo'] == 20500
+    # Un saldo nulo cuenta como cero y un period nulo queda como ''
+    assert df.loc[('1234', '2024-06'), 'suma_saldo'] == 0
+    assert df.loc[('5678', ''), 'suma_cargo'] == 19900
+
+
+def test_tx_key_sum_wraps_modulo_2_64():
+    mayo = sumas(movimientos()).loc[('1234', '2024-05'), 'suma_tx_key']
+    assert int(mayo) % LoadVerifier.MODULUS == (-1 + 2 ** 63 - 1) % LoadVerifier.MODULUS
+
+
+def test_streamed_blocks_combine_to_the_same_sums():
+    df = movimientos()
+    acumulado = None
+    for i in range(len(df)):
+        acumulado = LoadVerifier.combine(acumulado, LoadVerifier.frame_checksums(df.iloc[[i]]))
+    combinado = acumulado.set_index(LoadVerifier.PARTITION).sort_index()
+    completo = sumas(df)
+    combinado['suma_tx_key'] = [int(v) % LoadVerifier.MODULUS for v in combinado['suma_tx_key']]
+    completo['suma_tx_key'] = [int(v) % LoadVerifier.MODULUS for v in completo['suma_tx_key']]
+    pd.testing.assert_frame_equal(combinado, completo, check_dtype=False)
+
+
+def test_verify_reports_only_partitions_that_differ():
+    df = movimientos()
+    esperado = LoadVerifier.frame_checksums(df)
+    en_base = esperado.copy()
+    en_base['suma_tx_key'] = [str(int(v) % LoadVerifier.MODULUS) for v in en_base['suma_tx_key']]
+    en_base.loc[en_base['period'] == '2024-06', 'suma_cargo'] += 1
+
+    class Verificador(LoadVerifier):
+        def table_checksums(self, conn, schema, table_name, keys):
+            assert sorted(keys) == sorted(df['tx_key'].astype('int64'))
+            return en_base
+
+    diferencias = Verificador().verify(None, 'banorte_load', 'debito_cerrado', esperado, df['tx_key'].to_numpy(dtype='int64'))
+    assert diferencias[['cuenta', 'period', 'no_cuadra']].values.tolist() == [['1234', '2024-06', 'suma_cargo']]
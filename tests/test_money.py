@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Library.money import Money
+
+
+@pytest.mark.parametrize('texto, centavos', [
+    ('$1,000.10', 100010),
+    ('1000', 100000),
+    ('  20 ', 2000),
+    ('0.5', 50),
+    ('.75', 75),
+    ('3.', 300),
+    ('-12.30', -1230),
+    ('12.30-', -1230),
+    ('($45.00)', -4500),
+    ('1,234.56 MXN', 123456),
+    ('10.005', 1001),   # half-up con más de dos decimales
+    ('10.004', 1000),
+])
+def test_to_cents_parses_text(texto, centavos):
+    assert Money.to_cents(pd.Series([texto])).iloc[0] == centavos
+
+
+@pytest.mark.parametrize('texto', ['', '   ', 'N/A', 'abc', None, '1.2.3'])
+def test_to_cents_invalid_text_is_na(texto):
+    assert pd.isna(Money.to_cents(pd.Series([texto], dtype=object)).iloc[0])
+
+
+def test_to_cents_numeric_inputs():
+    flotantes = Money.to_cents(pd.Series([0.1 + 0.2, 199.0, -5.25, np.nan]))
+    assert flotantes.dtype == 'Int64'
+    assert flotantes.tolist()[:3] == [30, 19900, -525]
+    assert pd.isna(flotantes.iloc[3])
+    assert Money.to_cents(pd.Series([3, -2])).tolist() == [300, -200]
+    ya_centavos = pd.Series([5, None], dtype='Int64')
+    assert Money.to_cents(ya_centavos) is ya_centavos
+
+
+def test_to_text_formats_pesos():
+    serie = pd.Series([100010, 5, -1230, -5, 0, None], dtype='Int64', index=[3, 4, 5, 6, 7, 8])
+    texto = Money.to_text(serie)
+    assert texto.tolist() == ['1000.10', '0.05', '-12.30', '-0.05', '0.00', None]
+    assert texto.index.equals(serie.index)
+
+
+def test_round_trip_and_float():
+    textos = pd.Series(['$1,000.10', '-0.05', '0', None], dtype=object)
+    centavos = Money.to_cents(textos)
+    assert Money.to_text(centavos).tolist() == ['1000.10', '-0.05', '0.00', None]
+    pesos = Money.to_float(centavos)
+    assert pesos.dtype == 'float64'
+    assert pesos.tolist()[:3] == [1000.10, -0.05, 0.0]
+    assert np.isnan(pesos.iloc[3])
+
+
+def test_frame_to_float_only_touches_cent_columns():
+    df = pd.DataFrame({
+        'cargo': pd.array([150, None], dtype='Int64'),
+        'saldo': [1.5, 2.0],
+        'cuenta': pd.array([1234, 5678], dtype='Int64'),
+    })
+    pesos = Money.frame_to_float(df)
+    assert pesos['cargo'].tolist()[0] == 1.5 and np.isnan(pesos['cargo'].iloc[1])
+    assert pesos['saldo'].tolist() == [1.5, 2.0]
+    assert pesos['cuenta'].dtype == 'Int64'
+    assert df['cargo'].dtype == 'Int64'
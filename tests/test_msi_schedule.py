@@ -0,0 +1,77 @@
+import pandas as pd
+
+from Library.cutoff_calendar import CutoffCalendar
+from Library.msi_schedule import MsiSchedule
+
+
+def calendario():
+    meses = [f"2024-{m:02d}" for m in range(1, 13)]
+    return CutoffCalendar([f"{mes}-06" for mes in meses], meses)
+
+
+def planes(**columnas):
+    """Planes ya normalizados (importes en centavos), un renglón por plan."""
+    base = {
+        'cuenta': ['1234'],
+        'fecha_operacion': [pd.Timestamp('2024-01-15')],
+        'unique_concept': ['TIENDA_1'],
+        'importe_inicial': [120000],
+        'concepto': ['TIENDA'],
+        'tasa_anual': ['0.00%'],
+        'importe_pendiente': [90000],
+        'pagos_pendientes': ['3'],
+        'mensualidad': [30000],
+        'file_date': [pd.Timestamp('2024-03-10')],
+    }
+    base.update(columnas)
+    df = pd.DataFrame(base)
+    for col in ['importe_inicial', 'importe_pendiente', 'mensualidad']:
+        df[col] = df[col].astype('Int64')
+    return df
+
+
+def test_one_row_per_pending_installment_on_consecutive_cutoffs():
+    # Plazo de 4 (120000 / 30000) desde 2024-01-15: la primera fue en el corte de 2024-02
+    df = MsiSchedule.expand(MsiSchedule.prepare_plans(planes()), calendario())
+    assert df['period'].tolist() == ['2024-03', '2024-04', '2024-05']
+    assert df['pago_restante'].tolist() == [1, 2, 3]
+    assert df['mensualidad'].tolist() == [30000, 30000, 30000]
+
+
+def test_last_installment_closes_the_pending_amount():
+    df = MsiSchedule.expand(MsiSchedule.prepare_plans(planes(importe_pendiente=[90005])), calendario())
+    assert df['mensualidad'].tolist() == [30000, 30000, 30005]
+
+
+def test_blank_installment_is_derived_from_pending_amount():
+    df_planes = MsiSchedule.prepare_plans(planes(mensualidad=[None]))
+    assert df_planes['mensualidad'].tolist() == [30000]
+    df = MsiSchedule.expand(df_planes, calendario())
+    assert df['mensualidad'].notna().all()
+    assert df['mensualidad'].sum() == 90000
+
+
+def test_plans_without_amounts_or_pending_payments_are_skipped():
+    df_planes = MsiSchedule.prepare_plans(pd.concat([
+        planes(),
+        planes(unique_concept=['SIN_MONTO'], mensualidad=[None], importe_pendiente=[None]),
+        planes(unique_concept=['LIQUIDADO'], pagos_pendientes=['0']),
+    ], ignore_index=True))
+    assert df_planes['unique_concept'].tolist() == ['TIENDA_1']
+    assert df_planes['tasa_anual'].tolist() == [0.0]
+
+
+def test_schedule_does_not_depend_on_the_download_date():
+    uno = MsiSchedule.expand(MsiSchedule.prepare_plans(planes()), calendario())
+    otro = MsiSchedule.expand(MsiSchedule.prepare_plans(planes(file_date=[pd.Timestamp('2024-05-30')])), calendario())
+    assert uno['fecha_corte'].tolist() == otro['fecha_corte'].tolist()
+
+
+def test_installments_follow_the_account_cutoffs():
+    meses = [f"2024-{m:02d}" for m in range(1, 13)]
+    cortes = pd.DataFrame({'account_number': ['1234', '1234'],
+                           'fecha': ['2024-01-20', '2024-02-20'], 'periodo': ['2024-01', '2024-02']})
+    cal = CutoffCalendar([f"{mes}-06" for mes in meses], meses, cortes)
+    df = MsiSchedule.expand(MsiSchedule.prepare_plans(planes()), cal)
+    # Primera mensualidad en el corte de la cuenta del 2024-01-20; después siguen los generales
+    assert df['fecha_corte'].dt.strftime('%Y-%m-%d').tolist() == ['2024-02-20', '2024-03-06', '2024-04-06']
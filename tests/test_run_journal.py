@@ -0,0 +1,22 @@
+from datetime import date
+
+import pandas as pd
+
+from Library.frame_memory import FrameMemory
+from Library.run_journal import RunJournal
+
+
+def test_reloaded_frames_keep_compact_columns(tmp_path):
+    journal = RunJournal(str(tmp_path))
+    journal.start('firma')
+    df = pd.DataFrame({'cargo': pd.array([100, 250], dtype='Int64')})
+    for col, valor in (('cuenta', '1234'), ('file_date', date(2024, 5, 1)), ('period', '2024-05')):
+        df[col] = FrameMemory.constant(valor, df.index)
+    journal.mark_done('normalize', frames=journal.save_frames('normalize', {'debit_current': df}))
+
+    frames = journal.load_frames('normalize', ['debit_current', 'credit_current'])
+    assert frames['credit_current'] is None
+    recuperado = frames['debit_current']
+    for col in ('cuenta', 'file_date', 'period'):
+        assert isinstance(recuperado[col].dtype, pd.CategoricalDtype)
+    assert recuperado['file_date'].iloc[0] == date(2024, 5, 1)
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from Library.sql_reader import SqlReader
+
+
+def test_other_connections_use_read_sql():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, 'x'), (2, None)])
+    df = SqlReader(min_rows=0).read(conn, "SELECT * FROM t ORDER BY a")
+    pd.testing.assert_frame_equal(df, pd.read_sql("SELECT * FROM t ORDER BY a", conn))
+
+
+@pytest.fixture
+def postgres():
+    url = os.environ.get('TEST_SQL_WORKFLOW')
+    if not url:
+        pytest.skip("TEST_SQL_WORKFLOW no está definida")
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+    engine = sqlalchemy.create_engine(url)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+CONSULTA = """
+    SELECT g::int AS entero, CASE WHEN mod(g, 7) = 0 THEN NULL ELSE g END AS con_nulos,
+           (g * 1.5)::numeric(12,2) AS monto, DATE '2024-01-01' + mod(g, 30) AS fecha,
+           'c' || g AS texto, '' AS vacio, NULL::text AS nada, mod(g, 2) = 0 AS par
+    FROM generate_series(1, 2000) g
+"""
+
+
+@pytest.mark.parametrize('min_rows', [0, 10 ** 9])
+def test_copy_and_read_sql_give_the_same_frame(postgres, min_rows):
+    reader = SqlReader(min_rows=min_rows)
+    usado = []
+    copia = reader.copy_to_frame
+    reader.copy_to_frame = lambda cur, query: usado.append(query) or copia(cur, query)
+
+    df = reader.read(postgres, CONSULTA)
+    assert bool(usado) == (min_rows == 0)
+    pd.testing.assert_frame_equal(df, pd.read_sql(CONSULTA, postgres))
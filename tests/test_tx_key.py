@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from Library import tx_key
+from Library.tx_key import TxKey
+
+BASE_SQL = os.path.join(os.path.dirname(__file__), '..', 'queries', '00_create_base.sql')
+
+# Renglones como salen de StagingLoader.sanitize: montos en texto 'pesos.cc'
+MOVIMIENTOS = pd.DataFrame({
+    'fecha': pd.to_datetime(['2024-05-01', '2024-12-31', '2023-01-09', '2024-02-29']),
+    'unique_concept': ['12', 'OXXO', 'CAFÉ', ''],
+    'cargo': ['10.50', '0.00', '1234567.89', '-3.10'],
+    'abono': ['0.00', '5.00', '0.00', None],
+})
+
+
+def sql_expression(fecha, unique_concept, cargo, abono):
+    """El cuerpo de banorte_load.tx_key escrito en Python, término por término."""
+    partes = [
+        fecha.strftime('%Y-%m-%d') if fecha is not None else '',
+        unique_concept if unique_concept is not None else '',
+        f"{float(cargo):.2f}" if cargo is not None else '',
+        f"{float(abono):.2f}" if abono is not None else '',
+    ]
+    # ('x' || substr(md5(...), 1, 16))::bit(64)::bigint
+    return int.from_bytes(bytes.fromhex(hashlib.md5('|'.join(partes).encode('utf-8')).hexdigest()[:16]), 'big', signed=True)
+
+
+def test_compute_matches_sql_definition():
+    esperado = [sql_expression(*row) for row in MOVIMIENTOS.astype(object).where(MOVIMIENTOS.notna(), None).itertuples(index=False)]
+    resultado = TxKey.compute(MOVIMIENTOS)
+    assert resultado.dtype == 'Int64'
+    assert resultado.tolist() == esperado
+
+
+@pytest.mark.parametrize('arrow', [True, False])
+def test_md5_prefix_matches_hashlib(monkeypatch, arrow):
+    """El md5 por columnas contra hashlib: textos vacíos, de varios bloques y no ASCII."""
+    if not arrow:
+        monkeypatch.setattr(tx_key, 'ARROW_AVAILABLE', False)
+    textos = ['', 'a', 'x' * 55, 'x' * 56, 'x' * 64, 'CAFÉ|ñ' * 30, '2024-05-01|OXXO|0.00|5.00']
+    esperado = [int.from_bytes(hashlib.md5(t.encode('utf-8')).digest()[:8], 'big', signed=True) for t in textos]
+    assert TxKey.md5_prefix(pd.Series(textos)).tolist() == esperado
+    # Una serie rebanada no empieza en el byte 0 de su buffer
+    assert TxKey.md5_prefix(pd.Series(textos).iloc[2:]).tolist() == esperado[2:]
+
+
+def test_compute_keeps_index_and_assign_adds_column():
+    df = MOVIMIENTOS.set_axis([7, 3, 9, 1])
+    assert TxKey.compute(df).index.equals(df.index)
+    assert TxKey.assign(df)[TxKey.COLUMN].tolist() == TxKey.compute(MOVIMIENTOS).tolist()
+
+
+def test_key_changes_with_each_column():
+    base = TxKey.compute(MOVIMIENTOS.iloc[[0]]).iloc[0]
+    for col, valor in [('fecha', pd.Timestamp('2024-05-02')), ('unique_concept', '13'),
+                       ('cargo', '10.51'), ('abono', '0.01')]:
+        otro = MOVIMIENTOS.iloc[[0]].copy()
+        otro[col] = valor
+        assert TxKey.compute(otro).iloc[0] != base
+
+
+def test_compute_matches_postgres_function():
+    """Contra la función de 00_create_base.sql en una base real (TEST_SQL_WORKFLOW)."""
+    url = os.environ.get('TEST_SQL_WORKFLOW')
+    if not url:
+        pytest.skip("TEST_SQL_WORKFLOW no está definida")
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+
+    with open(BASE_SQL, encoding='utf-8') as f:
+        cuerpo = re.search(r'FUNCTION banorte_load\.tx_key\(.*?\$\$(.*?)\$\$', f.read(), re.S).group(1)
+    cuerpo = cuerpo.strip().rstrip(';')
+    consulta = sqlalchemy.text(f"""
+        WITH v (fecha, unique_concept, cargo, abono) AS (
+            SELECT CAST(:fecha AS DATE), CAST(:unique_concept AS TEXT),
+                   CAST(:cargo AS NUMERIC), CAST(:abono AS NUMERIC)
+        )
+        {cuerpo} FROM v
+    """)
+    filas = MOVIMIENTOS.assign(fecha=MOVIMIENTOS['fecha'].dt.date).astype(object)
+    filas = filas.where(filas.notna(), None).to_dict('records')
+    engine = sqlalchemy.create_engine(url)
+    try:
+        with engine.connect() as conn:
+            en_base = [conn.execute(consulta, fila).scalar() for fila in filas]
+    finally:
+        engine.dispose()
+    assert TxKey.compute(MOVIMIENTOS).tolist() == en_base